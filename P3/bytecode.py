@@ -0,0 +1,445 @@
+from intbase import ErrorType, InterpreterBase
+from helperclasses import Field, FieldRef, Literal, LocalRef, Method, Type
+import utils as utils
+
+from array import array
+from enum import IntEnum
+from typing import List, Tuple
+
+# Instructions are (opcode, argument) pairs of ints; what the argument means depends on the opcode
+# The stack holds Fields, just like the values passed around by the tree-walking executors
+class Opcode(IntEnum):
+    LOAD_CONST = 0          # Push consts[arg]
+    LOAD_LOCAL = 1          # Push frame slot arg
+    LOAD_FIELD = 2          # Push the field described by consts[arg]: (slot, name, type, obj name)
+    LOAD_ME = 3             # Push the receiver
+    LOAD_NONE = 4           # Push None (the value of a statement that does not produce one)
+    POP = 5
+    STORE_LOCAL = 6         # Pop into the variable described by consts[arg]: (frame slot, name)
+    STORE_FIELD = 7         # Pop into the field described by consts[arg]: (slot, name, type, obj name)
+    ADD = 8                 # Binary operators pop the right operand, then the left one
+    SUB = 9
+    MUL = 10
+    DIV = 11
+    MOD = 12
+    LT = 13
+    GT = 14
+    LE = 15
+    GE = 16
+    EQ = 17
+    NE = 18
+    AND = 19
+    OR = 20
+    NOT = 21                # consts[arg] is the operand as written (for the error message)
+    JUMP = 22               # Jump to instruction arg
+    JUMP_IF_FALSE = 23      # Pop a predicate, jump to instruction arg if it is false
+    CALL = 24               # Pop the target variable and the arguments; consts[arg]: (method name, number of args, target name)
+    CALL_EXPR = 25          # Same, with the target being the value of an expression
+    CALL_ME = 26            # Same, calling the receiver; consts[arg]: (method name, number of args)
+    CALL_SUPER = 27         # Same, calling the receiver through its superclass
+    NEW = 28                # consts[arg] is the class name
+    PRINT = 29              # Pop and print arg values
+    INPUT = 30              # consts[arg]: (command, variable reference)
+    LET = 31                # Initialize the variables declared by consts[arg] (a LetDeclarations)
+    SETUP_TRY = 32          # Exceptions thrown until the matching POP_TRY jump to instruction arg
+    POP_TRY = 33
+    STORE_EXCEPTION = 34    # Pop a thrown exception into the "exception" variable in frame slot arg
+    THROW = 35
+    CHECK_RETURN = 36       # Type check the top of the stack against consts[arg]: (type, obj name)
+    RETURN = 37             # Return the popped value from a "return" statement
+    RETURN_NONE = 38        # "return" with nothing to return
+    END = 39                # End of the method body reached, return the popped value (the body's value)
+    ERROR = 40              # Raise the error consts[arg]: (error type, message, line number or None)
+    RAISE = 41              # Raise the Python exception consts[arg] (a malformed statement)
+    CHECK_OPERANDS = 42     # Type check the operands on top of the stack have values; consts[arg]: (operator, number of operands, operand as written)
+
+BINARY_OPCODES = {
+    "+": Opcode.ADD, "-": Opcode.SUB, "*": Opcode.MUL, "/": Opcode.DIV, "%": Opcode.MOD,
+    "<": Opcode.LT, ">": Opcode.GT, "<=": Opcode.LE, ">=": Opcode.GE, "==": Opcode.EQ, "!=": Opcode.NE,
+    "&": Opcode.AND, "|": Opcode.OR
+}
+
+# Marks instructions that have no line number in the line table (an instruction's line is only used in error messages
+# if the statement it belongs to reports errors with a line number)
+NO_LINE = -1
+
+# The variables declared by a let statement; they are checked the first time the let runs
+class LetDeclarations:
+    __slots__ = ('declared_vars', 'line_num', 'checked')
+
+    def __init__(self, declared_vars: List[List[any]], line_num: int):
+        self.declared_vars = declared_vars
+        self.line_num = line_num
+        self.checked: List[Tuple[int, str, Type, any, str | None]] | None = None
+
+    def __repr__(self) -> str:
+        return f"let {[[str(part) for part in dec_var] for dec_var in self.declared_vars]}"
+
+# A compiled method
+class CodeObject:
+    __slots__ = ('name', 'current_class', 'code', 'lines', 'consts', 'frame_size', 'calls')
+
+    def __init__(self, name: str, current_class: any, code: array, lines: array, consts: List[any], frame_size: int):
+        self.name = name
+        self.current_class = current_class
+        self.code = code            # opcode, argument, opcode, argument, ...
+        self.lines = lines          # Line number of each instruction (NO_LINE if none)
+        self.consts = consts        # Constant pool
+        self.frame_size = frame_size
+        self.calls = 0              # Number of times the method has run, to find hot methods
+
+# Compiles a resolved method body into bytecode
+# Running it behaves like ObjectDefinition's tree-walking executors (same output, same errors on the same lines)
+def compile_method(method: Method, current_class: any, interpreter: InterpreterBase) -> CodeObject:
+    code = array('i')
+    lines = array('i')
+    consts: List[any] = []
+    const_indices = dict()
+    # Line of the statement being compiled, for instructions that do not report errors themselves
+    statement_line: int | None = None
+
+    def __add_const(const: any) -> int:
+        # Only identical constants are shared; Fields and lists are mutable, so they always get their own entry
+        key = (type(const), const) if isinstance(const, (str, int, tuple)) else id(const)
+        if key not in const_indices:
+            const_indices[key] = len(consts)
+            consts.append(const)
+        return const_indices[key]
+
+    def __emit(opcode: Opcode, arg: int = 0, line_num: int | None = None) -> int:
+        code.append(opcode)
+        code.append(arg)
+        line_num = line_num if line_num is not None else statement_line
+        lines.append(line_num if line_num is not None else NO_LINE)
+        return len(lines) - 1
+
+    def __emit_error(error_type: ErrorType, message: str, line_num: int | None = None):
+        __emit(Opcode.ERROR, __add_const((error_type, message, line_num)))
+
+    def __patch_jump(instruction: int, target: int):
+        code[2 * instruction + 1] = target
+
+    def __next_instruction() -> int:
+        return len(lines)
+
+    def __is_expression_statement(statement: List[any]) -> bool:
+        return len(statement) > 0 and isinstance(statement[0], str) and statement[0] in EXPRESSION_COMMANDS
+
+    # Only statements that are not expressions can have no value
+    def __may_be_none(expr: any) -> bool:
+        return isinstance(expr, list) and not __is_expression_statement(expr)
+
+    # A local variable or field (no "me")
+    def __compile_variable(var_name: str, line_num: int):
+        if isinstance(var_name, LocalRef):
+            __emit(Opcode.LOAD_LOCAL, var_name.index)
+        elif isinstance(var_name, FieldRef):
+            declared_field = current_class.field_layout[var_name.slot]
+            __emit(Opcode.LOAD_FIELD, __add_const((var_name.slot, declared_field.name, declared_field.type, declared_field.obj_name)))
+        else:
+            __emit_error(ErrorType.NAME_ERROR, f"Unknown variable: {var_name}", line_num)
+
+    # A constant/literal, "me" or a variable
+    def __compile_token(token: str, line_num: int):
+        if isinstance(token, Literal):
+            __emit(Opcode.LOAD_CONST, __add_const(token.field))
+        elif token == InterpreterBase.ME_DEF:
+            __emit(Opcode.LOAD_ME)
+        else:
+            __compile_variable(token, line_num)
+
+    # Pushes the value of an operand/argument/predicate
+    def __compile_expression(expr: any, line_num: int):
+        if isinstance(expr, list):
+            __compile_statement(expr, True)
+        else:
+            __compile_token(expr, line_num)
+
+    # If push_value is set, the statement leaves its value (its return field) on the stack
+    def __compile_statement(statement: List[any], push_value: bool):
+        nonlocal statement_line
+        enclosing_statement_line = statement_line
+
+        # A malformed statement only fails once it actually runs
+        start = (len(code), len(lines))
+        try:
+            __compile_statement_unchecked(statement, push_value)
+        except (IndexError, TypeError, AttributeError) as e:
+            del code[start[0]:], lines[start[1]:]
+            __emit(Opcode.RAISE, __add_const(e))
+
+        statement_line = enclosing_statement_line
+
+    def __compile_statement_unchecked(statement: List[any], push_value: bool):
+        nonlocal statement_line
+        command = statement[0]
+        statement_line = getattr(statement, "line_num", statement_line)
+        if __is_expression_statement(statement):
+            __compile_expression_statement(statement)
+            if not push_value:
+                __emit(Opcode.POP)
+            return
+
+        match command:
+            case InterpreterBase.BEGIN_DEF:
+                __compile_begin(statement[1:], push_value)
+
+            case InterpreterBase.IF_DEF:
+                __compile_if(statement.line_num, statement[1:], push_value)
+
+            case InterpreterBase.INPUT_INT_DEF | InterpreterBase.INPUT_STRING_DEF:
+                __compile_input(statement.line_num, command, statement[1])
+                if not push_value:
+                    __emit(Opcode.POP)
+
+            case InterpreterBase.PRINT_DEF:
+                for expression in statement[1:]:
+                    __compile_expression(expression, statement.line_num)
+                __emit(Opcode.PRINT, len(statement) - 1)
+                if push_value:
+                    __emit(Opcode.LOAD_NONE)
+
+            case InterpreterBase.RETURN_DEF:
+                if len(statement) < 2:
+                    __emit(Opcode.RETURN_NONE)
+                else:
+                    __compile_return(statement.line_num, statement[1])
+
+            case InterpreterBase.SET_DEF:
+                __compile_set(statement.line_num, statement[1], statement[2])
+                if push_value:
+                    __emit(Opcode.LOAD_NONE)
+
+            case InterpreterBase.WHILE_DEF:
+                __compile_while(statement.line_num, statement[1], statement[2])
+                if push_value:
+                    __emit(Opcode.LOAD_NONE)
+
+            case InterpreterBase.LET_DEF:
+                __emit(Opcode.LET, __add_const(LetDeclarations(statement[1], statement.line_num)))
+                __compile_begin(statement[2:], push_value)
+
+            # [3] is the frame slot of the "exception" variable, added when resolving the method body
+            case InterpreterBase.TRY_DEF:
+                if len(statement) >= 3:
+                    __compile_try(statement[1], statement[2], statement[3], push_value)
+                else:
+                    __compile_statement(statement[1], push_value)
+
+            case InterpreterBase.THROW_DEF:
+                __compile_throw(statement.line_num, statement[1])
+
+            case _:
+                __emit_error(ErrorType.SYNTAX_ERROR, f"Unknown statement/expression: {command}", statement.line_num)
+
+    def __compile_expression_statement(statement: List[any]):
+        command = statement[0]
+        match command:
+            case InterpreterBase.CALL_DEF:
+                __compile_call(statement.line_num, statement[1], statement[2], statement[3:])
+
+            case InterpreterBase.NEW_DEF:
+                __emit(Opcode.NEW, __add_const(statement[1]), statement.line_num)
+
+            case "!":
+                __compile_expression(statement[1], statement.line_num)
+                if __may_be_none(statement[1]):
+                    __emit(Opcode.CHECK_OPERANDS, __add_const((command, 1, str(statement[1]))), statement.line_num)
+                __emit(Opcode.NOT, __add_const(statement[1]), statement.line_num)
+
+            # Arithmetic and comparison operators
+            case _:
+                operands = statement[1:]
+                if len(operands) > 2:
+                    __emit_error(ErrorType.SYNTAX_ERROR, f"Invalid number of operands for operator: {command}", statement.line_num)
+                    return
+
+                for operand in operands:
+                    __compile_expression(operand, statement.line_num)
+                if len(operands) < 2:
+                    __emit(Opcode.RAISE, __add_const(IndexError("list index out of range")))
+                else:
+                    if any(__may_be_none(operand) for operand in operands):
+                        __emit(Opcode.CHECK_OPERANDS, __add_const((command, 2, None)), statement.line_num)
+                    __emit(BINARY_OPCODES[command], 0, statement.line_num)
+
+    def __compile_begin(substatements: List[any], push_value: bool):
+        if len(substatements) == 0:
+            if push_value:
+                __emit(Opcode.LOAD_NONE)
+            return
+
+        for substatement in substatements[:-1]:
+            __compile_statement(substatement, False)
+        __compile_statement(substatements[-1], push_value)
+
+    # Arguments are always evaluated before the target
+    def __compile_call(line_num: int, target_obj: any, method_name: str, method_args: List[any]):
+        for arg in method_args:
+            __compile_expression(arg, line_num)
+
+        if isinstance(target_obj, list):
+            __compile_statement(target_obj, True)
+            __emit(Opcode.CALL_EXPR, __add_const((method_name, len(method_args), None)), line_num)
+        elif target_obj == InterpreterBase.ME_DEF:
+            __emit(Opcode.CALL_ME, __add_const((method_name, len(method_args))), line_num)
+        elif target_obj == InterpreterBase.SUPER_DEF:
+            if current_class.superclass is None:
+                __emit_error(ErrorType.TYPE_ERROR, f"Super class does not exist on class {current_class.name}", line_num)
+            else:
+                __emit(Opcode.CALL_SUPER, __add_const((method_name, len(method_args))), line_num)
+        else:
+            __compile_variable(target_obj, line_num)
+            __emit(Opcode.CALL, __add_const((method_name, len(method_args), str(target_obj))), line_num)
+
+    def __compile_if(line_num: int, args: List[any], push_value: bool):
+        if len(args) != 2 and len(args) != 3:
+            __emit_error(ErrorType.SYNTAX_ERROR, "Too few or too many arguments for if statement", line_num)
+            return
+
+        __compile_expression(args[0], line_num)
+        jump_to_false_clause = __emit(Opcode.JUMP_IF_FALSE, 0, line_num)
+        __compile_statement(args[1], push_value)
+        jump_to_end = __emit(Opcode.JUMP)
+
+        __patch_jump(jump_to_false_clause, __next_instruction())
+        if len(args) == 3:
+            __compile_statement(args[2], push_value)
+        elif push_value:
+            __emit(Opcode.LOAD_NONE)
+        __patch_jump(jump_to_end, __next_instruction())
+
+    def __compile_while(line_num: int, predicate: any, true_clause: List[any]):
+        loop_start = __next_instruction()
+        __compile_expression(predicate, line_num)
+        jump_to_end = __emit(Opcode.JUMP_IF_FALSE, 0, line_num)
+        __compile_statement(true_clause, False)
+        __emit(Opcode.JUMP, loop_start)
+        __patch_jump(jump_to_end, __next_instruction())
+
+    def __compile_input(line_num: int, command: str, var: str):
+        if isinstance(var, LocalRef) or isinstance(var, FieldRef):
+            __emit(Opcode.INPUT, __add_const((command, var)), line_num)
+        else:
+            __emit_error(ErrorType.NAME_ERROR, f"Unknown variable: {var}", line_num)
+
+    def __compile_return(line_num: int, expr: any):
+        # A void method should not return anything
+        if method.return_type[0] == Type.NULL:
+            __emit_error(ErrorType.TYPE_ERROR, "Invalid return type: void method cannot return anything", line_num)
+            return
+
+        __compile_expression(expr, line_num)
+        __emit(Opcode.CHECK_RETURN, __add_const(method.return_type), line_num)
+        __emit(Opcode.RETURN)
+
+    # The new value is evaluated first
+    def __compile_set(line_num: int, var_name: str, new_val: any):
+        if isinstance(new_val, list):
+            __compile_statement(new_val, True)
+        elif isinstance(new_val, Literal):
+            __compile_token(new_val, line_num)
+        else:
+            __compile_variable(new_val, line_num)
+
+        if isinstance(var_name, LocalRef):
+            __emit(Opcode.STORE_LOCAL, __add_const((var_name.index, str(var_name))), line_num)
+        elif isinstance(var_name, FieldRef):
+            declared_field = current_class.field_layout[var_name.slot]
+            __emit(Opcode.STORE_FIELD, __add_const((var_name.slot, str(var_name), declared_field.type, declared_field.obj_name)), line_num)
+        else:
+            __emit_error(ErrorType.NAME_ERROR, f"Unknown variable: {var_name}", line_num)
+
+    def __compile_try(try_statement: any, catch_statement: any, exception_var: LocalRef, push_value: bool):
+        setup_try = __emit(Opcode.SETUP_TRY)
+        __compile_statement(try_statement, push_value)
+        __emit(Opcode.POP_TRY)
+        jump_to_end = __emit(Opcode.JUMP)
+
+        __patch_jump(setup_try, __next_instruction())
+        __emit(Opcode.STORE_EXCEPTION, exception_var.index)
+        __compile_statement(catch_statement, push_value)
+        __patch_jump(jump_to_end, __next_instruction())
+
+    def __compile_throw(line_num: int, exception_msg: any):
+        if isinstance(exception_msg, Literal) and exception_msg.raw_type != Type.STRING and exception_msg.raw_type != Type.EXCEPTION:
+            __emit_error(ErrorType.TYPE_ERROR, f"Cannot throw object of type '{exception_msg.raw_type}', expected 'Type.STRING'")
+            return
+
+        __compile_expression(exception_msg, line_num)
+        __emit(Opcode.THROW)
+
+    # The body's value is what the method returns if it ends without a "return"
+    __compile_statement(method.body, True)
+    __emit(Opcode.END)
+
+    return CodeObject(f"{current_class.name}.{method.name}", current_class, code, lines, consts, method.frame_size)
+
+# Statements that are really expressions: they always produce a value
+EXPRESSION_COMMANDS = {InterpreterBase.CALL_DEF, InterpreterBase.NEW_DEF, "!"} | set(BINARY_OPCODES.keys())
+
+# Lists a method's instructions, one per line, as: line number, instruction index, opcode, argument (and what it refers to)
+def disassemble(code_object: CodeObject) -> str:
+    output = [f"{code_object.name} ({len(code_object.lines)} instructions, {code_object.frame_size} frame slots, called {code_object.calls} times)"]
+    jump_targets = {
+        code_object.code[i + 1] for i in range(0, len(code_object.code), 2)
+        if code_object.code[i] in [Opcode.JUMP, Opcode.JUMP_IF_FALSE, Opcode.SETUP_TRY]
+    }
+
+    for instruction in range(len(code_object.lines)):
+        opcode = Opcode(code_object.code[2 * instruction])
+        arg = code_object.code[2 * instruction + 1]
+        line_num = code_object.lines[instruction]
+
+        match opcode:
+            case Opcode.LOAD_CONST | Opcode.LOAD_FIELD | Opcode.STORE_LOCAL | Opcode.STORE_FIELD | Opcode.NOT | \
+                 Opcode.CALL | Opcode.CALL_EXPR | Opcode.CALL_ME | Opcode.CALL_SUPER | Opcode.NEW | Opcode.INPUT | \
+                 Opcode.LET | Opcode.CHECK_RETURN | Opcode.ERROR | Opcode.RAISE | Opcode.CHECK_OPERANDS:
+                description = f"({__describe_const(code_object.consts[arg])})"
+            case Opcode.JUMP | Opcode.JUMP_IF_FALSE | Opcode.SETUP_TRY:
+                description = f"(to {arg})"
+            case Opcode.LOAD_LOCAL | Opcode.STORE_EXCEPTION:
+                description = f"(slot {arg})"
+            case _:
+                description = ""
+
+        output.append(
+            f"{line_num if line_num != NO_LINE else '':>6} {'>>' if instruction in jump_targets else '  '} {instruction:>5} "
+            f"{opcode.name:<16} {arg:>4} {description}".rstrip()
+        )
+
+    return "\n".join(output)
+
+def __describe_const(const: any) -> str:
+    if isinstance(const, Field):
+        return f"{const.type.name.lower()} {const.value!r}"
+    elif isinstance(const, tuple):
+        return ", ".join(__describe_const(part) for part in const)
+    elif isinstance(const, Type):
+        return const.name.lower()
+    else:
+        return str(const)
+
+# Runs a program with the bytecode engine, then disassembles its most called methods
+# Usage: python3 bytecode.py program.brewin [number of methods to show]
+if __name__ == "__main__":
+    import sys
+    from helperclasses import Engine
+    from interpreterv3 import Interpreter
+
+    with open(sys.argv[1]) as f:
+        program = f.read().splitlines()
+
+    interpreter = Interpreter(engine=Engine.VM)
+    interpreter.run(program)
+
+    code_objects = [
+        method.code
+        for class_name in interpreter.get_valid_class_list()
+        for method_list in interpreter.get_class(class_name).methods.values()
+        for method in method_list
+    ]
+    code_objects.sort(key=lambda code_object: code_object.calls, reverse=True)
+    for code_object in code_objects[:int(sys.argv[2]) if len(sys.argv) >= 3 else 5]:
+        print()
+        print(disassemble(code_object))
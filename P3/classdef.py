@@ -1,26 +1,40 @@
 from intbase import ErrorType, InterpreterBase
-from helperclasses import Field, Method, Type
+from helperclasses import Engine, Field, LRUCache, Method, Type
 from objdef import ObjectDefinition
+import bytecode as bytecode
+import compiler as compiler
+import resolver as resolver
 import utils as utils
+import vm as vm
 
 import copy
-from typing import Dict, List, Self, Tuple
+import functools
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, Self, Tuple
 
 class ClassDefinition:
+    # Maximum number of concrete classes kept around per template class
+    MAX_SPECIALIZATIONS = 64
+
     def __init__(self, chunk: List[str | List[str]], superclass: Self | None, current_class_list: List[str], current_tclass_list: List[str], is_template_class: bool, interpreter: InterpreterBase, trace_output: bool):
         # Instance variables
         self.name = chunk[1]
         self.methods: Dict[str, List[Method]] = dict()
         self.fields: Dict[str, Field] = dict()
         self.superclass: ClassDefinition | None = superclass
+
+        # Names of this class and every class it inherits from, for O(1) subtype checks
+        self.ancestors: FrozenSet[str] = frozenset([self.name]) | (superclass.ancestors if superclass is not None else frozenset())
         self.__current_class_list: List[str] = current_class_list
         self.__current_tclass_list: List[str] = current_tclass_list
 
         # For template classes
         self.is_template_class = is_template_class
         self.template_types: List[str] = None
+        self.specializations: LRUCache | None = None
         if is_template_class:
             self.template_types = chunk[2]
+            self.specializations = LRUCache(ClassDefinition.MAX_SPECIALIZATIONS)
         else:
             self.template_types = []
 
@@ -140,55 +154,154 @@ class ClassDefinition:
                     # First check name
                     if method_name not in self.methods:
                         self.methods[method_name] = list()
-                    # Check if overload
-                    elif utils.get_correct_method(self.methods, method_name, list(map(lambda p: (p[0], p[2]), method_params_list_parsed)), interpreter) is None:
+                    # Check if overload (an overload must differ in its parameter types)
+                    elif all(utils.get_method_signature(m.parameters) != utils.get_method_signature(method_params_list_parsed) for m in self.methods[method_name]):
                         pass
                     else:
                         interpreter.error(ErrorType.NAME_ERROR, f"Duplicate method: {method_name}", body_chunk[0].line_num)
 
                     self.methods[method_name].append(Method(method_name, method_return_type_parsed, method_params_list_parsed, method_body))
-                
-    def instantiate_self(self) -> ObjectDefinition:
-        obj = ObjectDefinition(self.trace_output)
 
-        obj.set_class_name(self.name)
-        obj.set_names_of_valid_classes(self.__current_class_list + list(self.template_types))
-        obj.set_names_of_valid_tclasses(self.__current_tclass_list)
-        obj.set_superclass((self.superclass).instantiate_self() if self.superclass is not None else None)
+        # Freeze the method table; every instance of this class shares it instead of getting its own copy
+        self.methods: Mapping[str, Tuple[Method, ...]] = MappingProxyType({
+            method_name: tuple(method_list) for method_name, method_list in self.methods.items()
+        })
+
+        # Names an object of this class can refer to; computed once and shared by every instance
+        self.__names_of_valid_classes: List[str] = self.__current_class_list + list(self.template_types)
+
+        self.__build_field_layout()
+        if not is_template_class:
+            self.__resolve_methods(interpreter)
+        self.__build_method_index()
+
+    # Lays out the fields of the whole hierarchy in one slot-indexed store
+    # The superclass's fields come first, so this class's own fields start at field_offset
+    def __build_field_layout(self):
+        self.field_offset: int = self.superclass.num_fields if self.superclass is not None else 0
+        self.field_slots: Dict[str, int] = {
+            field_name: self.field_offset + i for i, field_name in enumerate(self.fields.keys())
+        }
+        self.num_fields: int = self.field_offset + len(self.fields)
+
+        # Declared name/type of every slot, and the initial values copied into each new object
+        self.field_layout: List[Field] = (self.superclass.field_layout if self.superclass is not None else []) + list(self.fields.values())
+        self.__field_defaults: List[any] = [field.value for field in self.field_layout]
+
+    # Resolves every variable name in this class's method bodies to its frame or field slot
+    # (and compiles the resolved bodies, unless the interpreter uses the tree-walking engine)
+    def __resolve_methods(self, interpreter: InterpreterBase):
+        # The transpiler only resolves the methods its code cache does not have
+        if interpreter.engine == Engine.TRANSPILE:
+            self.methods = MappingProxyType({
+                method_name: tuple(interpreter.transpiled_program.get_method(self, method, index) for index, method in enumerate(method_list))
+                for method_name, method_list in self.methods.items()
+            })
+            return
+
+        # The program cache only resolves the methods its entry does not have
+        if interpreter.cached_program is not None:
+            self.methods = MappingProxyType({
+                method_name: tuple(interpreter.cached_program.get_method(self, method, index) for index, method in enumerate(method_list))
+                for method_name, method_list in self.methods.items()
+            })
+        else:
+            self.methods = MappingProxyType({
+                method_name: tuple(resolver.resolve_method(method, self.field_slots) for method in method_list)
+                for method_name, method_list in self.methods.items()
+            })
+
+        if interpreter.engine == Engine.CLOSURE:
+            for method_list in self.methods.values():
+                for method in method_list:
+                    method.compiled = compiler.compile_method(method, self, interpreter)
+        elif interpreter.engine == Engine.VM:
+            for method_list in self.methods.values():
+                for method in method_list:
+                    method.code = bytecode.compile_method(method, self, interpreter)
+                    method.compiled = functools.partial(vm.execute, method.code, interpreter)
+
+    # Builds the flattened virtual method table and resets the dispatch cache
+    # The vtable maps (name, number of parameters) to every candidate overload, inherited ones included,
+    # in lookup order: this class's own overloads first, then its superclass's (and so on up the hierarchy)
+    def __build_method_index(self):
+        self.vtable: Dict[Tuple[str, int], Tuple[Tuple[Self, Method], ...]] = dict()
+        for method_name, method_list in self.methods.items():
+            for method in method_list:
+                vtable_key = (method_name, len(method.parameters))
+                self.vtable[vtable_key] = self.vtable.get(vtable_key, tuple()) + ((self, method),)
+
+        if self.superclass is not None:
+            for vtable_key, inherited_entries in self.superclass.vtable.items():
+                own_entries = self.vtable.get(vtable_key, tuple())
+                own_signatures = [utils.get_method_signature(m.parameters) for (_, m) in own_entries]
+
+                # Overridden methods can never be picked, so leave them out
+                self.vtable[vtable_key] = own_entries + tuple(
+                    (owner, m) for (owner, m) in inherited_entries if utils.get_method_signature(m.parameters) not in own_signatures
+                )
+
+        # Resolved targets keyed by (name, runtime types of the arguments)
+        self.__dispatch_cache: Dict[Tuple[str, Tuple], Tuple[Self, Method] | None] = dict()
+
+    # Finds the overload matching the passed arguments, along with the class that defines it
+    def find_method(self, method_name: str, params: List[Field], interpreter: InterpreterBase) -> Tuple[Self, Method] | None:
+        # Objects are keyed by their actual class, since that is what decides compatibility
+        dispatch_key = (method_name, tuple(
+            (p.type, p.obj_name, p.value.class_name if isinstance(p.value, ObjectDefinition) else None) for p in params
+        ))
+
+        if dispatch_key in self.__dispatch_cache:
+            return self.__dispatch_cache[dispatch_key]
+
+        found = None
+        if (candidates := self.vtable.get((method_name, len(params)))) is not None:
+            found_method = utils.get_correct_method([m for (_, m) in candidates], list(map(lambda f: (f.type, f.obj_name, f.value), params)), interpreter)
+            if found_method is not None:
+                found = next(entry for entry in candidates if entry[1] is found_method)
+
+        self.__dispatch_cache[dispatch_key] = found
+        return found
 
+    def instantiate_self(self) -> ObjectDefinition:
         # Non-template classes only
         if self.is_template_class:
             return None
-        
-        # Add fields and methods
-        for field in self.fields.values():
-            obj.add_field(copy.copy(field))
-        for method_list in self.methods.values():
-            obj.add_method(copy.deepcopy(method_list))
-
-        return obj
+
+        # One object holds the field values of the whole hierarchy; everything else is shared through the class
+        return ObjectDefinition(self, list(self.__field_defaults))
     
     def instantiate_self_tclass(self, template_types_actual: List[str], interpreter: InterpreterBase) -> ObjectDefinition:
-        obj = ObjectDefinition(self.trace_output)
-
-        obj.set_class_name(self.name)
-        obj.set_names_of_valid_classes(self.__current_class_list + list(self.template_types))
-        obj.set_names_of_valid_tclasses(self.__current_tclass_list)
-        obj.set_superclass((self.superclass).instantiate_self() if self.superclass is not None else None)
-
-        # Non-template classes only
+        # Template classes only
         if not self.is_template_class:
             return None
-        
+
+        return self.get_specialization(template_types_actual, interpreter).instantiate_self()
+
+    # The concrete class for the given actual types; each (tclass, actual types) pair is only specialized once
+    def get_specialization(self, template_types_actual: List[str], interpreter: InterpreterBase) -> Self:
+        specialization_key = tuple(template_types_actual)
+        if (specialization := self.specializations.get(specialization_key)) is None:
+            specialization = self.__specialize(template_types_actual, interpreter)
+            self.specializations.put(specialization_key, specialization)
+
+        return specialization
+
+    # Creates a concrete (non-template) class with all template types replaced by the actual types
+    def __specialize(self, template_types_actual: List[str], interpreter: InterpreterBase) -> Self:
         # Replace template types with actual types
         matched_template_types = dict(zip(self.template_types, template_types_actual))
 
-        def __get_new_field(old_field: Field, new_type: Type | str):
-            if isinstance(new_type, str):
-                return Field(old_field.name, Type.OBJ, old_field.value, new_type)
+        # Primitive actual types become their own type, everything else is an object type
+        def __get_actual_type(template_type: str) -> Tuple[Type, str | None]:
+            actual_type = matched_template_types[template_type]
+            parsed_type = utils.parse_type_from_str(actual_type, self.__current_class_list, self.__current_tclass_list)
+            if parsed_type in [Type.INT, Type.BOOL, Type.STRING]:
+                return (parsed_type, None)
             else:
-                return Field(old_field.name, new_type, old_field.value, None)
+                return (Type.OBJ, actual_type)
 
+        specialized_fields: Dict[str, Field] = dict()
         for old_field in self.fields.values():
             new_field = copy.copy(old_field)
 
@@ -197,7 +310,8 @@ class ClassDefinition:
 
             # Replace templated types with actual types
             if new_field.obj_name in matched_template_types.keys():
-                new_field = __get_new_field(new_field, matched_template_types[new_field.obj_name])
+                new_type, new_obj_name = __get_actual_type(new_field.obj_name)
+                new_field = Field(new_field.name, new_type, new_field.value, new_obj_name)
 
             # If field was previously uninitialized, we have to get default values now
             if field_was_uninit:
@@ -219,52 +333,78 @@ class ClassDefinition:
                 except Exception as e:
                     interpreter.error(ErrorType.TYPE_ERROR, f"Invalid initial value '{init_field.value}' for field '{new_field.name}': {str(e)}")
 
-            obj.add_field(new_field)
+                new_field = Field(new_field.name, new_field.type, init_field.value, new_field.obj_name)
+
+            specialized_fields[new_field.name] = new_field
 
-        for method_list in self.methods.values():
+        # Replace references in actual body
+        # Can only occur in
+        #   "new" statement, e.g. (new generic_type)
+        #   "let" statement, e.g. (let ((generic_type g1) (generic_type g2)))
+        def __find_and_replace(body: List[str], find_replace: Dict[str, str]):
+            for i, body_part in enumerate(body):
+                if isinstance(body_part, list):
+                    __find_and_replace(body_part, find_replace)
+                else:
+                    match body_part:
+                        case InterpreterBase.NEW_DEF:
+                            # Replace typename
+                            # The chunk after "new" is always the type
+                            if body[i + 1] in find_replace.keys():
+                                body[i + 1] = find_replace[body[i + 1]]
+                        case InterpreterBase.LET_DEF:
+                            # Replace typename in declaration
+                            # declarations in format [0]: type, [1]: name, [2]: init_value?
+                            for declaration in body[i + 1]:
+                                if declaration[0] in find_replace.keys():
+                                    declaration[0] = find_replace[declaration[0]]
+                        case _:
+                            pass
+
+        specialized_methods: Dict[str, Tuple[Method, ...]] = dict()
+        for method_name, method_list in self.methods.items():
             new_methods = copy.deepcopy(method_list)
 
             for new_method in new_methods:
                 # Replace return type
                 if new_method.return_type[1] in matched_template_types.keys():
-                    new_ret_type_temp_field = __get_new_field(Field("temp_replace_ret_type", new_method.return_type[0], None, new_method.return_type[1]), matched_template_types[new_method.return_type[1]])
-                    new_method.return_type = (new_ret_type_temp_field.type, new_ret_type_temp_field.obj_name)
-                
+                    new_method.return_type = __get_actual_type(new_method.return_type[1])
+
                 # Replace param types
                 for i, method_param in enumerate(new_method.parameters):
                     if method_param[2] is not None and method_param[2] in matched_template_types.keys():
-                        new_param_temp_field = __get_new_field(Field(method_param[1], method_param[0], None, method_param[2]), matched_template_types[method_param[2]])
-                        new_method.parameters[i] = (new_param_temp_field.type, new_param_temp_field.name, new_param_temp_field.obj_name)
-
-                # Replace references in actual body
-                # Can only occur in
-                #   "new" statement, e.g. (new generic_type)
-                #   "let" statement, e.g. (let ((generic_type g1) (generic_type g2)))
-                def __find_and_replace(body: List[str], find_replace: Dict[str, str]):
-                    for i, body_part in enumerate(body):
-                        if isinstance(body_part, list):
-                            __find_and_replace(body_part, find_replace)
-                        else:
-                            match body_part:
-                                case InterpreterBase.NEW_DEF:
-                                    # Replace typename
-                                    # The chunk after "new" is always the type
-                                    if body[i + 1] in matched_template_types.keys():
-                                        body[i + 1] = matched_template_types[body[i + 1]]
-                                case InterpreterBase.LET_DEF:
-                                    # Replace typename in declaration
-                                    # declarations in format [0]: type, [1]: name, [2]: init_value?
-                                    for declaration in body[i + 1]:
-                                        if declaration[0] in matched_template_types.keys():
-                                            declaration[0] = matched_template_types[declaration[0]]
-                                case _:
-                                    pass
+                        new_param_type, new_param_obj_name = __get_actual_type(method_param[2])
+                        new_method.parameters[i] = (new_param_type, method_param[1], new_param_obj_name)
 
                 __find_and_replace(new_method.body, matched_template_types)
 
-            obj.add_method(new_methods)
-        
-        return obj
-    
+            specialized_methods[method_name] = new_methods
+
+        # The specialization shares everything else (valid class names, etc.) with the template
+        specialization = copy.copy(self)
+        specialization.name = InterpreterBase.TYPE_CONCAT_CHAR.join([self.name] + list(template_types_actual))
+        specialization.ancestors = frozenset([specialization.name])
+        specialization.is_template_class = False
+        specialization.fields = specialized_fields
+        specialization.methods = MappingProxyType(specialized_methods)
+        specialization.specializations = None
+        specialization.__build_field_layout()
+        specialization.__resolve_methods(interpreter)
+        specialization.__build_method_index()
+
+        return specialization
+
+    # Gives a class built before the rest of the program was read every class name of the program
+    def set_class_lists(self, current_class_list: List[str], current_tclass_list: List[str]):
+        self.__current_class_list = current_class_list
+        self.__current_tclass_list = current_tclass_list
+        self.__names_of_valid_classes = self.__current_class_list + list(self.template_types)
+
+    def get_names_of_valid_classes(self) -> List[str]:
+        return self.__names_of_valid_classes
+
+    def get_names_of_valid_tclasses(self) -> List[str]:
+        return self.__current_tclass_list
+
     def get_number_of_parameterized_types(self) -> int:
         return len(self.template_types)
\ No newline at end of file
@@ -0,0 +1,592 @@
+from intbase import ErrorType, InterpreterBase
+from helperclasses import BrewinThrow, CallFrame, Field, FieldRef, Literal, LocalRef, Method, TailCall, Type, bool_field, int_field, value_field
+from objdef import ObjectDefinition
+import utils as utils
+
+from typing import Callable, List, Tuple
+
+# A compiled statement returns (return_initiated, return_field), just like the tree-walking executors
+# (a returned call may be a TailCall, which ObjectDefinition.run_call runs in place of the method)
+StatementFn = Callable[[CallFrame], Tuple[bool, Field | None]]
+# A compiled expression returns the Field it evaluates to (a throw raises a BrewinThrow)
+ExpressionFn = Callable[[CallFrame], Field | None]
+
+# An operand that is a statement without a value (None), which no operator accepts: its type shows up as None in the
+# error, like in the tree-walking executors
+NO_VALUE = Field("temp", None, None)
+
+# Statements that are really expressions: their return field is their value and they never "return"
+EXPRESSION_COMMANDS = {
+    InterpreterBase.CALL_DEF, InterpreterBase.NEW_DEF, "!",
+    "+", "-", "*", "/", "%",
+    "<", ">", "<=", ">=", "!=", "==", "&", "|"
+}
+
+# Compiles a resolved method body into a tree of Python closures
+# Everything that does not depend on the running program (which executor to use, literal values, variable slots,
+# line numbers) is worked out here once, so running a statement is a single call
+# Behaves like ObjectDefinition's tree-walking executors (same output, same errors on the same lines), except that
+# trace_output is not supported
+def compile_method(method: Method, current_class: any, interpreter: InterpreterBase) -> StatementFn:
+    method_return_type = method.return_type
+
+    # Errors are raised when the offending statement runs, not when it is compiled
+    def __raise_error(error_type: ErrorType, message: str, line_num: int = None) -> StatementFn:
+        def __run(frame: CallFrame):
+            interpreter.error(error_type, message, line_num)
+        return __run
+
+    # Same rules (and messages) as utils.check_compatible_types, without building Fields on the common path
+    def __check_type(to_type: Type, to_obj_name: str | None, value_field: Field, message_prefix: str, line_num: int):
+        if not utils.is_compatible_type(to_type, to_obj_name, value_field.type, value_field.obj_name, value_field.value, interpreter):
+            try:
+                utils.check_compatible_types(Field("temp", to_type, None, to_obj_name), value_field, interpreter)
+            except Exception as e:
+                interpreter.error(ErrorType.TYPE_ERROR, f"{message_prefix}: {str(e)}", line_num)
+
+    # Fields are stored unboxed, so looking one up builds a Field from its declared name/type
+    def __compile_field_lookup(var_name: FieldRef) -> ExpressionFn:
+        field_slot = var_name.slot
+        declared_field = current_class.field_layout[field_slot]
+        field_name, field_type, field_obj_name = declared_field.name, declared_field.type, declared_field.obj_name
+        return lambda frame: Field(field_name, field_type, frame.receiver.values[field_slot], field_obj_name)
+
+    # A local variable or field (no "me"), like looking in the params list and then the class fields
+    def __compile_variable(var_name: str, line_num: int) -> ExpressionFn:
+        if isinstance(var_name, LocalRef):
+            local_index = var_name.index
+            return lambda frame: frame.locals[local_index]
+        elif isinstance(var_name, FieldRef):
+            return __compile_field_lookup(var_name)
+        else:
+            return __raise_error(ErrorType.NAME_ERROR, f"Unknown variable: {var_name}", line_num)
+
+    # A constant/literal, "me" or a variable
+    def __compile_token(token: str, line_num: int) -> ExpressionFn:
+        if isinstance(token, Literal):
+            constant = token.field
+            return lambda frame: constant
+        elif token == InterpreterBase.ME_DEF:
+            return lambda frame: Field("temp", Type.OBJ, frame.receiver, frame.receiver.class_name)
+        else:
+            return __compile_variable(token, line_num)
+
+    def __is_expression_statement(statement: List[any]) -> bool:
+        return len(statement) > 0 and isinstance(statement[0], str) and statement[0] in EXPRESSION_COMMANDS
+
+    # Only statements that are not expressions can have no value
+    def __may_be_none(expr: any) -> bool:
+        return isinstance(expr, list) and not __is_expression_statement(expr)
+
+    # Evaluates a nested statement for its value (its return field; a "return" nested in one just gives the returned value)
+    def __compile_nested(statement: List[any], return_type: Tuple[Type, str | None] | None) -> ExpressionFn:
+        if __is_expression_statement(statement):
+            return __compile_expression_statement(statement)
+
+        compiled_statement = __compile_statement(statement, return_type)
+        if return_type is None:
+            return lambda frame: compiled_statement(frame)[1]
+
+        def __run_nested(frame: CallFrame) -> Field | None:
+            statement_value = compiled_statement(frame)[1]
+            if type(statement_value) is TailCall:
+                statement_value = ObjectDefinition.run_call(statement_value.method, statement_value.frame, interpreter, statement_value.line_num)
+            return statement_value
+        return __run_nested
+
+    # Evaluates an operand/argument/predicate
+    def __compile_expression(expr: any, line_num: int) -> ExpressionFn:
+        if isinstance(expr, list):
+            return __compile_nested(expr, None)
+        else:
+            return __compile_token(expr, line_num)
+
+    def __compile_statement(statement: List[any], return_type: Tuple[Type, str | None] | None) -> StatementFn:
+        # A malformed statement only fails once it actually runs
+        try:
+            if __is_expression_statement(statement):
+                compiled_expression = __compile_expression_statement(statement)
+
+                return lambda frame: (False, compiled_expression(frame))
+
+            return __compile_statement_unchecked(statement, return_type)
+        except (IndexError, TypeError, AttributeError) as e:
+            def __run_malformed(frame: CallFrame):
+                raise e
+            return __run_malformed
+
+    def __compile_expression_statement(statement: List[any]) -> ExpressionFn:
+        try:
+            return __compile_expression_statement_unchecked(statement)
+        except (IndexError, TypeError, AttributeError) as e:
+            def __run_malformed(frame: CallFrame):
+                raise e
+            return __run_malformed
+
+    def __compile_statement_unchecked(statement: List[any], return_type: Tuple[Type, str | None] | None) -> StatementFn:
+        command = statement[0]
+        match command:
+            case InterpreterBase.BEGIN_DEF:
+                return __compile_begin([__compile_statement(substatement, return_type) for substatement in statement[1:]])
+
+            case InterpreterBase.IF_DEF:
+                return __compile_if(statement.line_num, statement[1:], return_type)
+
+            case InterpreterBase.INPUT_INT_DEF | InterpreterBase.INPUT_STRING_DEF:
+                return __compile_input(statement.line_num, command, statement[1])
+
+            case InterpreterBase.PRINT_DEF:
+                return __compile_print(statement.line_num, statement[1:], return_type)
+
+            case InterpreterBase.RETURN_DEF:
+                if len(statement) < 2:
+                    return lambda frame: (True, None)
+                return __compile_return(statement.line_num, statement[1], return_type)
+
+            case InterpreterBase.SET_DEF:
+                return __compile_set(statement.line_num, statement[1], statement[2], return_type)
+
+            case InterpreterBase.WHILE_DEF:
+                return __compile_while(statement.line_num, statement[1], statement[2], return_type)
+
+            case InterpreterBase.LET_DEF:
+                return __compile_let(statement.line_num, statement[1], statement[2:], return_type)
+
+            # [3] is the frame slot of the "exception" variable, added when resolving the method body
+            case InterpreterBase.TRY_DEF:
+                return __compile_try(
+                    statement[1],
+                    statement[2] if (len(statement) >= 3) else None,
+                    statement[3] if (len(statement) >= 4) else None,
+                    return_type
+                )
+
+            case InterpreterBase.THROW_DEF:
+                return __compile_throw(statement.line_num, statement[1], return_type)
+
+            case _:
+                def __run_unknown(frame: CallFrame):
+                    interpreter.error(ErrorType.SYNTAX_ERROR, f"Unknown statement/expression: {command}", statement.line_num)
+                return __run_unknown
+
+    def __compile_expression_statement_unchecked(statement: List[any]) -> ExpressionFn:
+        command = statement[0]
+        match command:
+            case InterpreterBase.CALL_DEF:
+                return __compile_call(statement.line_num, statement[1], statement[2], statement[3:])
+
+            case InterpreterBase.NEW_DEF:
+                return __compile_new(statement.line_num, statement[1])
+
+            case "+" | "-" | "*" | "/" | "%":
+                return __compile_arithmetic(statement.line_num, command, statement[1:])
+
+            case "<" | ">" | "<=" | ">=" | "!=" | "==" | "&" | "|":
+                return __compile_compare(statement.line_num, command, statement[1:])
+
+            case "!":
+                return __compile_unary_not(statement.line_num, statement[1])
+
+    def __compile_begin(substatements: List[StatementFn]) -> StatementFn:
+        def __run_begin(frame: CallFrame) -> Tuple[bool, Field | None]:
+            statement_return = (False, None)
+            for substatement in substatements:
+                statement_return = substatement(frame)
+                if statement_return[0]:
+                    return statement_return
+            return (False, statement_return[1])
+        return __run_begin
+
+    # A call in return position (tail_call: the calling method's return type and the line of the return statement) that
+    # returns the same type gives back a TailCall instead of running, so tail recursion takes constant stack space
+    def __compile_call(
+        line_num: int,
+        target_obj: any,
+        method_name: str,
+        method_args: List[any],
+        tail_call: Tuple[Tuple[Type, str | None], int] | None = None
+    ) -> ExpressionFn:
+        args = [__compile_expression(arg, line_num) for arg in method_args]
+
+        # The call runs straight from here (not through ObjectDefinition.call_method), one Python frame less for every
+        # Brewin call on the stack
+        if tail_call is None:
+            run_call = ObjectDefinition.run_call
+        else:
+            tail_return_type, return_line_num = tail_call
+
+            def run_call(method_to_call: Method, callee_frame: CallFrame, interpreter: InterpreterBase) -> Field | TailCall:
+                if method_to_call.return_type == tail_return_type:
+                    return TailCall(method_to_call, callee_frame, return_line_num)
+                return ObjectDefinition.run_call(method_to_call, callee_frame, interpreter)
+
+        # Arguments are always evaluated before the target
+        def __evaluate_args(frame: CallFrame) -> List[Field]:
+            return [arg(frame) for arg in args]
+
+        # Target object may be an expression
+        if isinstance(target_obj, list):
+            target = __compile_nested(target_obj, None)
+
+            def __run_call_expression(frame: CallFrame) -> Field:
+                arg_values = __evaluate_args(frame)
+                target_field = target(frame)
+                if not isinstance(target_field.value, ObjectDefinition):
+                    interpreter.error(ErrorType.TYPE_ERROR, f"Expression does not return a class", line_num)
+                method_to_call, callee_frame = target_field.value.prepare_call(method_name, arg_values, interpreter)
+                return run_call(method_to_call, callee_frame, interpreter)
+            return __run_call_expression
+
+        elif target_obj == InterpreterBase.ME_DEF:
+            def __run_call_me(frame: CallFrame) -> Field:
+                method_to_call, callee_frame = frame.receiver.prepare_call(method_name, __evaluate_args(frame), interpreter)
+                return run_call(method_to_call, callee_frame, interpreter)
+            return __run_call_me
+
+        elif target_obj == InterpreterBase.SUPER_DEF:
+            superclass = current_class.superclass
+
+            def __run_call_super(frame: CallFrame) -> Field:
+                arg_values = __evaluate_args(frame)
+                if superclass is None:
+                    interpreter.error(ErrorType.TYPE_ERROR, f"Super class does not exist on class {current_class.name}", line_num)
+                method_to_call, callee_frame = frame.receiver.prepare_call(method_name, arg_values, interpreter, superclass)
+                return run_call(method_to_call, callee_frame, interpreter)
+            return __run_call_super
+
+        else:
+            target = __compile_variable(target_obj, line_num)
+
+            def __run_call_variable(frame: CallFrame) -> Field:
+                arg_values = __evaluate_args(frame)
+                if (other_obj := target(frame).value) is None:
+                    interpreter.error(ErrorType.FAULT_ERROR, f"Reference is null: {target_obj}", line_num)
+                method_to_call, callee_frame = other_obj.prepare_call(method_name, arg_values, interpreter)
+                return run_call(method_to_call, callee_frame, interpreter)
+            return __run_call_variable
+
+    def __compile_if(line_num: int, args: List[any], return_type: Tuple[Type, str | None] | None) -> StatementFn:
+        if len(args) != 2 and len(args) != 3:
+            return __raise_error(ErrorType.SYNTAX_ERROR, "Too few or too many arguments for if statement", line_num)
+
+        predicate = __compile_expression(args[0], line_num)
+        true_clause = __compile_statement(args[1], return_type)
+        false_clause = __compile_statement(args[2], return_type) if len(args) == 3 else None
+
+        def __run_if(frame: CallFrame) -> Tuple[bool, Field | None]:
+            predicate_return = predicate(frame)
+            if predicate_return is None:
+                interpreter.error(ErrorType.TYPE_ERROR, f"Predicate cannot return null", line_num)
+            elif predicate_return.type != Type.BOOL:
+                interpreter.error(ErrorType.TYPE_ERROR, f"Predicate is not a boolean", line_num)
+
+            if predicate_return.value:
+                return true_clause(frame)
+            elif false_clause is not None:
+                return false_clause(frame)
+            else:
+                return (False, None)
+        return __run_if
+
+    def __compile_input(line_num: int, command: str, var: str) -> StatementFn:
+        if not isinstance(var, (LocalRef, FieldRef)):
+            return __raise_error(ErrorType.NAME_ERROR, f"Unknown variable: {var}", line_num)
+
+        input_info = (command, var)
+        return lambda frame: (False, utils.read_input(input_info, frame, line_num, interpreter))
+
+    def __compile_print(line_num: int, stuff_to_print: List[any], return_type: Tuple[Type, str | None] | None) -> StatementFn:
+        # Each part is either the already stringified literal or the expression to evaluate
+        parts: List[str | ExpressionFn] = []
+        for expression in stuff_to_print:
+            if isinstance(expression, list):
+                parts.append(__compile_nested(expression, return_type))
+            elif isinstance(expression, Literal):
+                parts.append(utils.stringify(Field("temp", expression.raw_type, expression.raw_value)))
+            else:
+                parts.append(__compile_token(expression, line_num))
+
+        def __run_print(frame: CallFrame) -> Tuple[bool, Field | None]:
+            about_to_print = []
+            for part in parts:
+                if isinstance(part, str):
+                    about_to_print.append(part)
+                else:
+                    about_to_print.append(utils.stringify(part(frame)))
+
+            interpreter.output("".join(about_to_print))
+            return (False, None)
+        return __run_print
+
+    def __compile_return(line_num: int, expr: any, return_type: Tuple[Type, str | None] | None) -> StatementFn:
+        # A void method should not return anything
+        if return_type is not None and return_type[0] == Type.NULL:
+            return __raise_error(ErrorType.TYPE_ERROR, "Invalid return type: void method cannot return anything", line_num)
+
+        # Called to evaluate an expression rather than to return from the method
+        if return_type is None:
+            value = __compile_nested(expr, None) if isinstance(expr, list) else __compile_token(expr, line_num)
+            return lambda frame: (True, value(frame))
+
+        to_type, to_obj_name = return_type
+
+        # A returned call may run in place of this method (see run_call), which then does the type check below
+        if isinstance(expr, list) and len(expr) >= 3 and expr[0] == InterpreterBase.CALL_DEF:
+            call = __compile_call(expr.line_num, expr[1], expr[2], expr[3:], (return_type, line_num))
+
+            def __run_return_call(frame: CallFrame) -> Tuple[bool, Field | TailCall]:
+                return_field = call(frame)
+                if type(return_field) is not TailCall:
+                    __check_type(to_type, to_obj_name, return_field, "Invalid return type", line_num)
+                return (True, return_field)
+            return __run_return_call
+
+        value = __compile_nested(expr, return_type) if isinstance(expr, list) else __compile_token(expr, line_num)
+
+        def __run_return(frame: CallFrame) -> Tuple[bool, Field | None]:
+            return_field = value(frame)
+            __check_type(to_type, to_obj_name, return_field, "Invalid return type", line_num)
+            return (True, return_field)
+        return __run_return
+
+    def __compile_set(line_num: int, var_name: str, new_val: any, return_type: Tuple[Type, str | None] | None) -> StatementFn:
+        # The new value is evaluated first
+        if isinstance(new_val, list):
+            new_value = __compile_nested(new_val, return_type)
+
+            def __evaluate_new_value(frame: CallFrame) -> Field:
+                new_value_field = new_value(frame)
+                if new_value_field is None:
+                    interpreter.error(ErrorType.TYPE_ERROR, f"Cannot set variable to result of void function", line_num)
+                return new_value_field
+        elif isinstance(new_val, Literal):
+            constant = new_val.field
+            __evaluate_new_value = lambda frame: constant
+        else:
+            __evaluate_new_value = __compile_variable(new_val, line_num)
+
+        if isinstance(var_name, LocalRef):
+            local_index = var_name.index
+
+            def __run_set_local(frame: CallFrame) -> Tuple[bool, Field | None]:
+                new_value_field = __evaluate_new_value(frame)
+
+                # A variable keeps its declared type, even when set to null
+                field_to_be_set = frame.locals[local_index]
+                __check_type(field_to_be_set.type, field_to_be_set.obj_name, new_value_field, f"Invalid type for variable '{var_name}'", line_num)
+                field_to_be_set.value = new_value_field.value
+                return (False, None)
+            return __run_set_local
+
+        elif isinstance(var_name, FieldRef):
+            field_slot = var_name.slot
+            declared_field = current_class.field_layout[field_slot]
+            to_type, to_obj_name = declared_field.type, declared_field.obj_name
+
+            def __run_set_field(frame: CallFrame) -> Tuple[bool, Field | None]:
+                new_value_field = __evaluate_new_value(frame)
+                __check_type(to_type, to_obj_name, new_value_field, f"Invalid type for variable '{var_name}'", line_num)
+                frame.receiver.values[field_slot] = new_value_field.value
+                return (False, None)
+            return __run_set_field
+
+        else:
+            def __run_set_unknown(frame: CallFrame) -> Tuple[bool, Field | None]:
+                __evaluate_new_value(frame)
+                interpreter.error(ErrorType.NAME_ERROR, f"Unknown variable: {var_name}", line_num)
+            return __run_set_unknown
+
+    def __compile_while(line_num: int, predicate_expr: any, true_clause_statement: List[any], return_type: Tuple[Type, str | None] | None) -> StatementFn:
+        predicate = __compile_expression(predicate_expr, line_num)
+        true_clause = __compile_statement(true_clause_statement, return_type)
+
+        def __run_while(frame: CallFrame) -> Tuple[bool, Field | None]:
+            while True:
+                predicate_return = predicate(frame)
+                if predicate_return is None or predicate_return.type != Type.BOOL:
+                    interpreter.error(ErrorType.TYPE_ERROR, f"Predicate is not a boolean", line_num)
+                elif not predicate_return.value:
+                    return (False, None)
+
+                clause_return = true_clause(frame)
+                if clause_return[0]:
+                    return clause_return
+        return __run_while
+
+    def __compile_new(line_num: int, class_name: str) -> ExpressionFn:
+        return lambda frame: utils.new_object(class_name, line_num, interpreter)
+
+    # An operand that may be a statement without a value gives NO_VALUE instead of None
+    def __compile_operand(arg: any, line_num: int) -> ExpressionFn:
+        operand = __compile_expression(arg, line_num)
+        if not __may_be_none(arg):
+            return operand
+
+        def __run_operand(frame: CallFrame) -> Field:
+            arg_value = operand(frame)
+            return NO_VALUE if arg_value is None else arg_value
+        return __run_operand
+
+    # The two operands of a binary operator, which it evaluates in order itself (so a call in an operand runs only one
+    # Python frame away from the operator's)
+    # A missing operand only fails once the ones before it have been evaluated
+    def __compile_operands(line_num: int, args: List[any]) -> Tuple[ExpressionFn, ExpressionFn]:
+        def __run_missing_operand(frame: CallFrame):
+            raise IndexError("list index out of range")
+
+        operands = [__compile_operand(arg, line_num) for arg in args] + [__run_missing_operand] * (2 - len(args))
+        return operands[0], operands[1]
+
+    def __compile_arithmetic(line_num: int, command: str, args: List[any]) -> ExpressionFn:
+        if len(args) > 2:
+            return __raise_error(ErrorType.SYNTAX_ERROR, f"Invalid number of operands for operator: {command}", line_num)
+
+        left_operand, right_operand = __compile_operands(line_num, args)
+        match command:
+            case "+":
+                operation = lambda a, b: a + b
+            case "-":
+                operation = lambda a, b: a - b
+            case "*":
+                operation = lambda a, b: a * b
+            case "/":
+                operation = lambda a, b: a // b     # Int division
+            case "%":
+                operation = lambda a, b: a % b
+
+        def __run_arithmetic(frame: CallFrame) -> Field:
+            left = left_operand(frame)
+            right = right_operand(frame)
+
+            # Operands can either be both strings (+) or both ints
+            if left.type == Type.INT and right.type == Type.INT:
+                return int_field(operation(left.value, right.value))
+            elif command == "+" and left.type == Type.STRING and right.type == Type.STRING:
+                return value_field(Type.STRING, operation(left.value, right.value))
+            else:
+                interpreter.error(ErrorType.TYPE_ERROR, f"Operands of type '{left.type}' and '{right.type}' are incompatible with operator: {command}", line_num)
+        return __run_arithmetic
+
+    def __compile_compare(line_num: int, command: str, args: List[any]) -> ExpressionFn:
+        if len(args) > 2:
+            return __raise_error(ErrorType.SYNTAX_ERROR, f"Invalid number of operands for operator: {command}", line_num)
+
+        left_operand, right_operand = __compile_operands(line_num, args)
+        match command:
+            # These only work for ints and strings
+            case "<":
+                allowed_types, operation = [Type.INT, Type.STRING], lambda a, b: a < b
+            case ">":
+                allowed_types, operation = [Type.INT, Type.STRING], lambda a, b: a > b
+            case "<=":
+                allowed_types, operation = [Type.INT, Type.STRING], lambda a, b: a <= b
+            case ">=":
+                allowed_types, operation = [Type.INT, Type.STRING], lambda a, b: a >= b
+
+            # These work for ints, strings, and booleans (and objects, see below)
+            case "==":
+                allowed_types, operation = [Type.INT, Type.STRING, Type.BOOL], lambda a, b: a == b
+            case "!=":
+                allowed_types, operation = [Type.INT, Type.STRING, Type.BOOL], lambda a, b: a != b
+
+            # These only work for booleans
+            case "&":
+                allowed_types, operation = [Type.BOOL], lambda a, b: a and b
+            case "|":
+                allowed_types, operation = [Type.BOOL], lambda a, b: a or b
+
+        compares_objects = command in ["==", "!="]
+        obj_null = [Type.NULL, Type.OBJ, Type.TCLASS]
+
+        def __run_compare(frame: CallFrame) -> Field:
+            left = left_operand(frame)
+            right = right_operand(frame)
+            if left.type == right.type and left.type in allowed_types:
+                pass
+            elif compares_objects and left.type in obj_null and right.type in obj_null:
+                # If either object reference is a literal "null", allowed, so need not check for same type
+                # Else comparisons need to check for compatibility (only error if both ways are incompatible)
+                if left.type != Type.NULL and right.type != Type.NULL:
+                    try:
+                        utils.check_compatible_types(left, right, interpreter)
+                    except RuntimeError:
+                        try:
+                            utils.check_compatible_types(right, left, interpreter)
+                        except RuntimeError as e:
+                            interpreter.error(ErrorType.TYPE_ERROR, f"Invalid type for operand '{right.name}': {str(e)}", line_num)
+            else:
+                interpreter.error(ErrorType.TYPE_ERROR, f"Operands of type '{left.type}' and '{right.type}' are incompatible with operator: {command}", line_num)
+
+            return bool_field(operation(left.value, right.value))
+        return __run_compare
+
+    def __compile_unary_not(line_num: int, arg: any) -> ExpressionFn:
+        operand = __compile_operand(arg, line_num)
+
+        def __run_unary_not(frame: CallFrame) -> Field:
+            arg_value = operand(frame)
+            # Unary NOT only works on booleans
+            if arg_value.type != Type.BOOL:
+                interpreter.error(ErrorType.TYPE_ERROR, f"The operator '!' is not compatible with the type of variable '{arg}': {arg_value.type}", line_num)
+            return bool_field(not arg_value.value)
+        return __run_unary_not
+
+    def __compile_let(line_num: int, declared_vars: List[List[any]], substatements: List[List[any]], return_type: Tuple[Type, str | None] | None) -> StatementFn:
+        body = __compile_begin([__compile_statement(substatement, return_type) for substatement in substatements])
+
+        # The declarations only depend on which classes exist, so they are checked the first time the let runs
+        declarations: List[Tuple[int, str, Type, any, str | None]] = None
+
+        def __run_let(frame: CallFrame) -> Tuple[bool, Field | None]:
+            nonlocal declarations
+            if declarations is None:
+                declarations = utils.check_let_declarations(declared_vars, line_num, current_class, interpreter)
+
+            frame_locals = frame.locals
+            for (local_index, var_name, var_type, init_value, obj_name) in declarations:
+                frame_locals[local_index] = Field(var_name, var_type, init_value, obj_name)
+
+            # Everything else is just like running a begin statement
+            return body(frame)
+        return __run_let
+
+    def __compile_try(try_statement: any, catch_statement: any, exception_var: LocalRef | None, return_type: Tuple[Type, str | None] | None) -> StatementFn:
+        try_clause = __compile_statement(try_statement, return_type)
+        catch_clause = __compile_statement(catch_statement, return_type) if catch_statement is not None else None
+
+        # With nothing to catch the exception, it just keeps going
+        if catch_clause is None:
+            return try_clause
+
+        def __run_try(frame: CallFrame) -> Tuple[bool, Field | None]:
+            try:
+                try_return = try_clause(frame)
+
+                # A tail call has to run before leaving the try statement, which catches what it throws
+                if try_return[0] and type(tail_call := try_return[1]) is TailCall:
+                    return (True, ObjectDefinition.run_call(tail_call.method, tail_call.frame, interpreter, tail_call.line_num))
+                return try_return
+            except BrewinThrow as thrown:
+                exception_value = thrown.exception_field.value
+
+            # Add a local var 'exception' that contains the thrown message
+            frame.locals[exception_var.index] = Field(InterpreterBase.EXCEPTION_VARIABLE_DEF, Type.STRING, exception_value, None)
+            return catch_clause(frame)
+        return __run_try
+
+    def __compile_throw(line_num: int, exception_msg: any, return_type: Tuple[Type, str | None] | None) -> StatementFn:
+        if isinstance(exception_msg, list):
+            message = __compile_nested(exception_msg, return_type)
+        else:
+            if isinstance(exception_msg, Literal) and exception_msg.raw_type != Type.STRING and exception_msg.raw_type != Type.EXCEPTION:
+                return __raise_error(ErrorType.TYPE_ERROR, f"Cannot throw object of type '{exception_msg.raw_type}', expected 'Type.STRING'")
+            message = __compile_token(exception_msg, line_num)
+
+        def __run_throw(frame: CallFrame) -> Tuple[bool, Field | None]:
+            message_field = message(frame)
+            if message_field.type != Type.STRING:
+                interpreter.error(ErrorType.TYPE_ERROR, f"Cannot throw object of type '{message_field.type}', expected 'Type.STRING'")
+            raise BrewinThrow(Field("temp", Type.EXCEPTION, message_field.value, None))
+        return __run_throw
+
+    return __compile_statement(method.body, method_return_type)
@@ -1,6 +1,7 @@
+from collections import OrderedDict
 from dataclasses import dataclass
 from enum import Enum
-from typing import List, Tuple
+from typing import Hashable, List, Tuple
 
 class Type(Enum):
     INT = 0
@@ -13,16 +14,212 @@ class Type(Enum):
     TUNINIT = 7 # For uninitialized template types
     TINIT = 8   # For initialized template types
 
+# How method bodies are executed
+class Engine(Enum):
+    TREE = 0        # Walk the statement lists every time they run (ObjectDefinition's executors)
+    CLOSURE = 1     # Compile each method body into closures once (compiler.py)
+    VM = 2          # Compile each method body into bytecode once and run it in a dispatch loop that calls methods without recursing (bytecode.py, vm.py)
+    TRANSPILE = 3   # Translate each method body into a Python function, cached on disk per program (transpiler.py)
+
+# How program text is split into tokens (both give the same nested token lists); BPARSER is the default
+class Parser(Enum):
+    BPARSER = 0     # The provided parser, one character at a time (bparser.py)
+    REGEX = 1       # One pass of a compiled regular expression per line (scanner.py)
+
 @dataclass
 class Method:
     name: str
     return_type: Tuple[Type, str | None]
     parameters: List[Tuple[Type, str, str]]     # param type, param name, param obj name (optional)
     body: any
+    frame_size: int = 0     # Number of local variable slots (parameters first), set once the body is resolved
+    compiled: any = None    # Runs the compiled body in a frame (every engine but Engine.TREE)
+    code: any = None        # The body's bytecode (Engine.VM only)
 
 @dataclass
 class Field:
     name: str
     type: Type
     value: any
-    obj_name: str = None
\ No newline at end of file
+    obj_name: str = None
+
+# A value produced by an expression, as opposed to a variable: the common ones are built once and shared (see value_field),
+# so nothing can assign to them
+# Variables (parameters, let and catch variables) always get a Field of their own, which is what "set" and inputs assign to
+class ValueField(Field):
+    def __init__(self, type: Type, value: any, obj_name: str = None):
+        object.__setattr__(self, "name", "temp")
+        object.__setattr__(self, "type", type)
+        object.__setattr__(self, "value", value)
+        object.__setattr__(self, "obj_name", obj_name)
+
+    def __setattr__(self, name: str, value: any):
+        raise AttributeError(f"Cannot assign to '{name}' of a shared value")
+
+TRUE_FIELD = ValueField(Type.BOOL, True)
+FALSE_FIELD = ValueField(Type.BOOL, False)
+NULL_FIELD = ValueField(Type.NULL, None)
+EMPTY_STRING_FIELD = ValueField(Type.STRING, "")
+
+# Ints in this range (loop counters, indices, small constants) also share their fields
+SMALL_INT_MIN = -128
+SMALL_INT_MAX = 1023
+SMALL_INT_FIELDS = [ValueField(Type.INT, i) for i in range(SMALL_INT_MIN, SMALL_INT_MAX + 1)]
+
+def int_field(value: int) -> Field:
+    if SMALL_INT_MIN <= value <= SMALL_INT_MAX:
+        return SMALL_INT_FIELDS[value - SMALL_INT_MIN]
+    return Field("temp", Type.INT, value)
+
+def bool_field(value: bool) -> Field:
+    return TRUE_FIELD if value else FALSE_FIELD
+
+# The field of an int, bool, string or null value, shared if it is a common one
+def value_field(value_type: Type, value: any) -> Field:
+    if value_type == Type.INT:
+        return int_field(value)
+    elif value_type == Type.BOOL:
+        return bool_field(value)
+    elif value_type == Type.NULL:
+        return NULL_FIELD
+    elif value_type == Type.STRING and value == "":
+        return EMPTY_STRING_FIELD
+    return Field("temp", value_type, value)
+
+# A variable name in a resolved method body that refers to a local variable (parameter, let variable or caught exception)
+# index is its slot in the method's frame
+class LocalRef(str):
+    def __new__(cls, name: str, index: int):
+        instance = super().__new__(cls, name)
+        instance.index = index
+        return instance
+
+# A variable name in a resolved method body that refers to a field of the class defining the method
+# slot is its position in the object's field values
+class FieldRef(str):
+    def __new__(cls, name: str, slot: int):
+        instance = super().__new__(cls, name)
+        instance.slot = slot
+        return instance
+
+# A literal token in a resolved method body (int, bool, null or string), with its type and value already parsed
+# field is the literal's value, which every evaluation of it gives back (see ValueField)
+class Literal(str):
+    def __new__(cls, token: str, raw_type: Type, raw_value: int | bool | str | None):
+        instance = super().__new__(cls, token)
+        instance.raw_type = raw_type
+        instance.raw_value = raw_value
+        instance.field = value_field(raw_type, raw_value)
+        if type(instance.field) is not ValueField:     # Not a common value, but still never assigned to
+            instance.field = ValueField(raw_type, raw_value)
+        return instance
+
+# A statement in a resolved method body: its command (a plain, interned string) followed by its arguments, as before,
+# with the line number of the command kept in the node instead
+# Every kind of statement has its own subclass, and no node has a __dict__
+class Statement(list):
+    __slots__ = ('line_num',)
+
+    def __init__(self, items: List[any], line_num: int | None):
+        super().__init__(items)
+        self.line_num = line_num
+
+class Begin(Statement):
+    __slots__ = ()
+
+class Call(Statement):
+    __slots__ = ()
+
+class If(Statement):
+    __slots__ = ()
+
+class Input(Statement):
+    __slots__ = ()
+
+class Print(Statement):
+    __slots__ = ()
+
+class Return(Statement):
+    __slots__ = ()
+
+class Set(Statement):
+    __slots__ = ()
+
+class While(Statement):
+    __slots__ = ()
+
+class New(Statement):
+    __slots__ = ()
+
+class Let(Statement):
+    __slots__ = ()
+
+class Try(Statement):
+    __slots__ = ()
+
+class Throw(Statement):
+    __slots__ = ()
+
+# Arithmetic, comparison and "!"
+class Operation(Statement):
+    __slots__ = ()
+
+# One activation of a method, pushed when the method is called and popped when it returns
+#   receiver: the object the method was called on (what "me" refers to; objects are flat, so it is always the most derived one)
+#   current_class: the class that defines the method, which decides the visible fields and what "super" is
+#   locals: the method's local variable slots (see LocalRef)
+#   return_field: what the last "return" statement run in the frame returned (Engine.TREE)
+class CallFrame:
+    __slots__ = ('receiver', 'current_class', 'locals', 'return_field')
+
+    def __init__(self, receiver: any, current_class: any, locals: List[Field]):
+        self.receiver = receiver
+        self.current_class = current_class
+        self.locals = locals
+        self.return_field = None
+
+# A call in return position that returns the same type as the method it is in (Engine.TREE, CLOSURE and TRANSPILE)
+# The method gives it back instead of running it, and ObjectDefinition.run_call runs it in the method's place
+#   line_num: the line of the return statement, whose type check is left to run_call (None if there is nothing to check)
+class TailCall:
+    __slots__ = ('method', 'frame', 'line_num')
+
+    def __init__(self, method: Method, frame: CallFrame, line_num: int | None):
+        self.method = method
+        self.frame = frame
+        self.line_num = line_num
+
+# A thrown Brewin exception (a Type.EXCEPTION field), raised through Python frames up to the try statement that catches it,
+# so code that does not throw never checks for one
+class BrewinThrow(Exception):
+    def __init__(self, exception_field: Field):
+        self.exception_field = exception_field
+
+class LRUCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__entries: OrderedDict[Hashable, any] = OrderedDict()
+
+    def get(self, key: Hashable) -> any:
+        if key in self.__entries:
+            self.hits += 1
+            self.__entries.move_to_end(key)
+            return self.__entries[key]
+        else:
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: any):
+        self.__entries[key] = value
+        self.__entries.move_to_end(key)
+
+        # Evict least recently used entries
+        while len(self.__entries) > self.max_size:
+            self.__entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self.__entries)
@@ -1,97 +1,198 @@
 from intbase import ErrorType, InterpreterBase 
 from bparser import BParser
 from classdef import ClassDefinition
+from helperclasses import BrewinThrow, CallFrame, Engine, Parser, Type, ValueField
+from programcache import CachedProgram
+from transpiler import TranspiledProgram
+from typechecker import TypeDiagnostic
+import scanner as scanner
+import typechecker as typechecker
 
-from typing import Dict, List, Set
+from typing import Dict, Iterable, List, Set, Tuple
 
 # Brewin v3 interpreter
 class Interpreter(InterpreterBase):
-    def __init__(self, console_output=True, inp=None, trace_output=False):
+    def __init__(self, console_output=True, inp=None, trace_output=False, engine=Engine.TREE, cache_dir=None, type_check=False, parser=Parser.BPARSER, cache_programs=False):
         super().__init__(console_output, inp)   # call InterpreterBase’s constructor
 
         # Instance vars
         self.__classes: Dict[str, ClassDefinition] = dict()
         self.__template_classes: Dict[str, ClassDefinition] = dict()
         self.trace_output = trace_output
-
-    def run(self, program: List[str]):
-        # Parse program
-        result, parsed_program = BParser.parse(program)
-        if not result:
-            return
-
-        # Discover all classes and put into storage
+        self.engine = engine
+
+        # The provided parser unless Parser.REGEX is asked for
+        self.parser = parser
+
+        # Engine.TRANSPILE: the generated code of the running program, cached under cache_dir (programcache.DEFAULT_CACHE_DIR if None)
+        self.cache_dir = cache_dir
+        self.transpiled_program: TranspiledProgram = None
+
+        # With cache_programs (any engine but Engine.TRANSPILE, which has a cache of its own), the parsed program and its
+        # resolved method bodies are cached under cache_dir as well (see programcache.py)
+        self.cache_programs = cache_programs
+        self.cached_program: CachedProgram = None
+
+        # Frames of the methods currently running, innermost last
+        self.call_stack: List[CallFrame] = []
+
+        # The null reference of each class (by type and class name) that methods give back by default (see utils.get_default_field)
+        self.null_object_fields: Dict[Tuple[Type, str], ValueField] = dict()
+
+        # With type_check, the whole program is type checked before it runs (see typechecker.py)
+        # The type errors found are only reported in type_errors: they are still raised when (and if) the code runs
+        # A verified program has none, so the tree-walking executors skip their runtime type checks
+        self.type_check = type_check
+        self.type_errors: List[TypeDiagnostic] = []
+        self.verified = False
+
+    # program is the program's lines, as a list or read as the program runs (a file object, for example)
+    def run(self, program: Iterable[str]):
+        # Parse program (unless it is cached: both the transpiled program and the cached program include the parsed program)
+        parsed_program = None
+        if self.engine == Engine.TRANSPILE:
+            program = list(program)     # The cache is keyed by the whole program
+            self.transpiled_program = TranspiledProgram(program, self, self.cache_dir)
+            parsed_program = self.transpiled_program.parsed_program
+        elif self.cache_programs:
+            program = list(program)
+            self.cached_program = CachedProgram(program, self.cache_dir)
+            parsed_program = self.cached_program.parsed_program
+
+        if parsed_program is None and self.parser == Parser.BPARSER:
+            result, parsed_program = BParser.parse(list(program))
+            if not result:
+                return
+
+        # Every class is built as soon as its definition has been read (with the regex parser, while the rest of the
+        # program is still being read), knowing only the classes read before it
+        # One that cannot be built yet (it refers to a class further down, or has an error) is left to a final pass,
+        # once every class name is known, which builds them in program order: errors are only raised there, so they
+        # are the same (and on the same lines) as if every class had been read first, and a program that turns out not
+        # to parse still does nothing
         discovery_list: Set[str] = set()
         discovery_list_tclass: Set[str] = set()
-        for top_level_chunk in parsed_program:
-            # top_level_chunk[0]: class, [1]: class_name, [2]: class_contents
-
-            # Ignore if not a class definition
-            if top_level_chunk[0] == InterpreterBase.CLASS_DEF:
-                # Parse definition
-                new_class_name = top_level_chunk[1]
-                discovery_list.add(new_class_name)
-            elif top_level_chunk[0] == InterpreterBase.TEMPLATE_CLASS_DEF:
-                new_class_name = top_level_chunk[1]
-                discovery_list_tclass.add(new_class_name)
-            else:
-                continue
-
-        # Actually create the classes
-        for top_level_chunk in parsed_program:
-            # top_level_chunk[0]: class, [1]: class_name, [2]: class_contents
-
-            # Ignore if not a class/tclass definition
-            if top_level_chunk[0] == InterpreterBase.CLASS_DEF:
-                # Parse definition
-                new_class_name = top_level_chunk[1]
-                superclass: ClassDefinition = None
-                if len(top_level_chunk) >= 4 and top_level_chunk[2] == InterpreterBase.INHERITS_DEF:
-                    superclass_name: str = top_level_chunk[3]
-                    if (superclass_def := self.get_class(superclass_name)) is None:
-                        self.error(ErrorType.TYPE_ERROR, f"Invalid class '{superclass_name}' in '{top_level_chunk}'", new_class_name.line_num)
+        class_chunks: List[List[any]] = []     # Every class/tclass definition, if a cache needs the parsed program
+        deferred_chunks: List[List[any]] = []
+        early_classes: List[ClassDefinition] = []
+        keep_class_chunks = self.engine == Engine.TRANSPILE or self.cached_program is not None
+        try:
+            with scanner.cyclic_gc_paused():
+                for top_level_chunk in (scanner.parse_chunks(program) if parsed_program is None else parsed_program):
+                    # top_level_chunk[0]: class, [1]: class_name, [2]: class_contents
+
+                    # Ignore if not a class/tclass definition
+                    if top_level_chunk[0] == InterpreterBase.CLASS_DEF:
+                        discovery = discovery_list
+                    elif top_level_chunk[0] == InterpreterBase.TEMPLATE_CLASS_DEF:
+                        discovery = discovery_list_tclass
+                    else:
+                        continue
+                    if keep_class_chunks:
+                        class_chunks.append(top_level_chunk)
+
+                    # A duplicate name is an error, raised in the final pass
+                    new_class_name = top_level_chunk[1]
+                    if new_class_name in discovery:
+                        deferred_chunks.append(top_level_chunk)
+                        continue
+                    discovery.add(new_class_name)
+
+                    # The classes after a deferred one are still built early (only those needing it are deferred too)
+                    if (new_class := self.__build_class_early(top_level_chunk, discovery_list, discovery_list_tclass)) is None:
+                        deferred_chunks.append(top_level_chunk)
                     else:
-                        superclass = superclass_def
+                        early_classes.append(new_class)
+        # Like BParser.parse, a program that does not parse does nothing
+        except scanner.ParseError:
+            return
+        parsed_program = class_chunks
 
-                # Create that class and add it to storage
-                if new_class_name in self.__classes:
-                    self.error(ErrorType.TYPE_ERROR, f"Duplicate class name {new_class_name}", new_class_name.line_num)
-                else:
-                    current_class_list = list(discovery_list)
-                    current_tclass_list = list(discovery_list_tclass)
-                    self.__classes[new_class_name] = ClassDefinition(top_level_chunk, superclass, current_class_list, current_tclass_list, False, self, self.trace_output)
-            elif top_level_chunk[0] == InterpreterBase.TEMPLATE_CLASS_DEF:
-                # Parse definition
-                new_class_name = top_level_chunk[1]
-
-                # TEMPLATE CLASSES CANNOT BE USED WITH INHERITANCE
-                if top_level_chunk[2] == InterpreterBase.INHERITS_DEF:
-                    self.error(ErrorType.SYNTAX_ERROR, f"Template classes may not be used with inheritance", new_class_name.line_num)
-
-                # Create that class and add it to storage
-                if new_class_name in self.__template_classes:
-                    self.error(ErrorType.TYPE_ERROR, f"Duplicate class name {new_class_name}", new_class_name.line_num)
-                else:
-                    current_class_list = list(discovery_list)
-                    current_tclass_list = list(discovery_list_tclass)
-                    self.__template_classes[new_class_name] = ClassDefinition(top_level_chunk, None, current_class_list, current_tclass_list, True, self, self.trace_output)
-            else:
-                continue
+        # The classes built early only knew the names before them
+        for class_def in early_classes:
+            class_def.set_class_lists(list(discovery_list), list(discovery_list_tclass))
+
+        # Actually create the remaining classes
+        for top_level_chunk in deferred_chunks:
+            self.__build_class(top_level_chunk, list(discovery_list), list(discovery_list_tclass))
 
         # Find main class
         if "main" not in self.__classes:
             self.error(ErrorType.NAME_ERROR, "No main class found")
 
+        # Every class is built, so every (non-template) method has been transpiled/resolved
+        if self.engine == Engine.TRANSPILE:
+            self.transpiled_program.finish(parsed_program)
+        elif self.cached_program is not None:
+            self.cached_program.finish(parsed_program)
+
+        if self.type_check:
+            type_check_result = typechecker.check_program(self)
+            self.type_errors = type_check_result.errors
+            self.verified = type_check_result.verified
+
         # Instantiate and run main class
         main_class = self.__classes['main'].instantiate_self()
-        main_class.call_method('main', [], [main_class], self)
+        try:
+            main_class.call_method('main', [], self)
+        # An exception nobody catches just ends the program
+        except BrewinThrow:
+            pass
 
         # DEBUG
         if self.trace_output:
-            print(f"Main.x is: {main_class.fields['x'].value}")
+            print(f"Main.x is: {main_class.get_var_from_polymorphic_fields('x', main_class.class_def).value}")
 
         return
 
+    # Builds a class with the classes read so far, or gives back None (leaving no trace of the error) when it refers
+    # to a class not read yet or has a Brewin error (InterpreterBase.error raises RuntimeError), to be built again once
+    # every class is known
+    def __build_class_early(self, chunk: List[any], discovery_list: Set[str], discovery_list_tclass: Set[str]) -> ClassDefinition | None:
+        error_type, error_line = self.error_type, self.error_line
+        try:
+            return self.__build_class(chunk, list(discovery_list), list(discovery_list_tclass))
+        except RuntimeError:
+            self.error_type, self.error_line = error_type, error_line
+            return None
+
+    # Checks a class/tclass definition against the classes built so far, then builds it and adds it to storage
+    def __build_class(self, top_level_chunk: List[any], current_class_list: List[str], current_tclass_list: List[str]) -> ClassDefinition:
+        # top_level_chunk[0]: class, [1]: class_name, [2]: class_contents
+        new_class_name = top_level_chunk[1]
+        if top_level_chunk[0] == InterpreterBase.CLASS_DEF:
+            # Parse definition
+            superclass: ClassDefinition = None
+            if len(top_level_chunk) >= 4 and top_level_chunk[2] == InterpreterBase.INHERITS_DEF:
+                superclass_name: str = top_level_chunk[3]
+                if (superclass_def := self.get_class(superclass_name)) is None:
+                    self.error(ErrorType.TYPE_ERROR, f"Invalid class '{superclass_name}' in '{top_level_chunk}'", new_class_name.line_num)
+                else:
+                    superclass = superclass_def
+
+            # Create that class and add it to storage
+            if new_class_name in self.__classes:
+                self.error(ErrorType.TYPE_ERROR, f"Duplicate class name {new_class_name}", new_class_name.line_num)
+            new_class = ClassDefinition(top_level_chunk, superclass, current_class_list, current_tclass_list, False, self, self.trace_output)
+            self.__classes[new_class_name] = new_class
+        else:
+            # TEMPLATE CLASSES CANNOT BE USED WITH INHERITANCE
+            if top_level_chunk[2] == InterpreterBase.INHERITS_DEF:
+                self.error(ErrorType.SYNTAX_ERROR, f"Template classes may not be used with inheritance", new_class_name.line_num)
+
+            # Create that class and add it to storage
+            if new_class_name in self.__template_classes:
+                self.error(ErrorType.TYPE_ERROR, f"Duplicate class name {new_class_name}", new_class_name.line_num)
+            new_class = ClassDefinition(top_level_chunk, None, current_class_list, current_tclass_list, True, self, self.trace_output)
+            self.__template_classes[new_class_name] = new_class
+        return new_class
+
+    def push_frame(self, frame: CallFrame):
+        self.call_stack.append(frame)
+
+    def pop_frame(self) -> CallFrame:
+        return self.call_stack.pop()
+
     def get_class(self, class_name: str) -> ClassDefinition | None:
         if class_name not in self.__classes:
             return None
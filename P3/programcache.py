@@ -0,0 +1,259 @@
+from bparser import StringWithLineNumber
+from intbase import InterpreterBase
+from helperclasses import FieldRef, Literal, LocalRef, Method, Statement, Type
+import resolver as resolver
+import scanner as scanner
+
+import dataclasses
+import hashlib
+import marshal
+import os
+import stat
+from typing import Dict, List, Tuple
+
+# Bump whenever the parser, the class analysis or the resolver changes what it produces, so stale entries are never loaded
+PROGRAM_CACHE_VERSION = 1
+
+# Where programs are cached unless the interpreter is given a cache_dir (shared with the transpiler's cache)
+# Entries are loaded as method bodies or run as code, so the default is per user ($XDG_CACHE_HOME or ~/.cache), never a
+# directory other users can write to
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ["XDG_CACHE_HOME"] if os.path.isabs(os.environ.get("XDG_CACHE_HOME", "")) else os.path.join(os.path.expanduser("~"), ".cache"),
+    "brewin"
+)
+
+# Once the cache directory's entries add up to more than this, the least recently used ones are removed
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+# File name endings of the entries the size cap applies to (.code: the transpiler's entries)
+CACHE_ENTRY_SUFFIXES = (".program", ".code")
+
+# An encoded program fragment is made of lists, plain strings and the tuples below, tagged by their first item,
+# so marshal can write it as is
+TOKEN = 0       # (TOKEN, text, line number): a StringWithLineNumber
+LOCAL = 1       # (LOCAL, name, frame slot): a LocalRef
+FIELD = 2       # (FIELD, name, field slot): a FieldRef
+LITERAL = 3     # (LITERAL, token, type value, value): a Literal
+NODE = 4        # (NODE, class name, line number, items): a Statement node
+
+STATEMENT_CLASSES = {cls.__name__: cls for cls in [Statement, *resolver.STATEMENT_KINDS.values()]}
+
+# The parsed class definitions of one program, and the resolved bodies of their methods, cached on disk keyed by the
+# program's text, so running the same program again skips both parsing and resolving (every engine but Engine.TRANSPILE,
+# which caches its generated code instead)
+# The classes themselves are still built on every run: that only looks at the class and method headers
+class CachedProgram:
+    def __init__(self, program: List[str], cache_dir: str | None = None):
+        self.__cache_dir = cache_dir if cache_dir is not None else DEFAULT_CACHE_DIR
+        self.__cache_path = os.path.join(self.__cache_dir, f"{program_hash(program)}.program")
+
+        # (resolved body, frame size) of every method resolved while the classes are built,
+        # by (class name, method name, overload index)
+        self.__methods: Dict[Tuple[str, str, int], Tuple[any, int]] = dict()
+        self.__recording = True
+
+        # None until the program has been parsed when it was not in the cache
+        self.parsed_program: List[any] | None = None
+        self.from_cache = self.__load()
+
+    # Resolves the index-th overload of a class's method, unless the cached entry already has its resolved body
+    def get_method(self, current_class: any, method: Method, index: int) -> Method:
+        key = (str(current_class.name), str(method.name), index)
+        if self.from_cache and key in self.__methods:
+            body, frame_size = self.__methods[key]
+            return dataclasses.replace(method, body=body, frame_size=frame_size)
+
+        resolved_method = resolver.resolve_method(method, current_class.field_slots)
+        if self.__recording and not self.from_cache:
+            self.__methods[key] = (resolved_method.body, resolved_method.frame_size)
+        return resolved_method
+
+    # Caches the program once its classes are built (template specializations are only built while the program runs,
+    # so they are resolved again on every run)
+    def finish(self, parsed_program: List[any]):
+        self.__recording = False
+        if self.from_cache:
+            return
+
+        # Method bodies are left out of the class definitions, since their resolved versions are cached
+        # (template classes resolve theirs once specialized, so they keep them)
+        encoded = dict()
+        try:
+            entry = marshal.dumps((
+                [encode(without_method_bodies(chunk), encoded) for chunk in parsed_program],
+                {key: (encode(body, encoded), frame_size) for key, (body, frame_size) in self.__methods.items()}
+            ))
+        except (ValueError, RecursionError):
+            return      # Nested too deeply for marshal, so the program is not cached
+        if len(entry) > MAX_CACHE_BYTES:
+            return
+
+        if write_entry(self.__cache_dir, self.__cache_path, entry):
+            evict_entries(self.__cache_dir, MAX_CACHE_BYTES)
+
+    # Decodes the cached entry (if any, and only if it can be trusted: see read_entry), which holds the parsed program
+    # and the resolved method bodies
+    # An entry that does not decode is a miss, and is removed (finish() writes a good one in its place)
+    def __load(self) -> bool:
+        entry = read_entry(self.__cache_path)
+        if entry is None:
+            return False
+
+        decoded = dict()
+        try:
+            chunks, methods = marshal.loads(entry)
+            if type(chunks) is not list or type(methods) is not dict:
+                raise TypeError("not a cached program")
+            with scanner.cyclic_gc_paused():
+                parsed_program = decode(chunks, decoded)
+                self.__methods = {key: (decode(body, decoded), frame_size) for key, (body, frame_size) in methods.items()}
+        except (EOFError, KeyError, IndexError, ValueError, TypeError, AttributeError):
+            self.__methods = dict()
+            try:
+                os.remove(self.__cache_path)
+            except OSError:
+                pass
+            return False
+        self.parsed_program = parsed_program
+
+        # A hit makes this entry the most recently used one (see evict_entries)
+        try:
+            os.utime(self.__cache_path)
+        except OSError:
+            pass
+        return True
+
+# A class definition with None in place of each method body
+def without_method_bodies(chunk: List[any]) -> List[any]:
+    if len(chunk) < 1 or chunk[0] != InterpreterBase.CLASS_DEF:
+        return chunk
+    return [
+        body_chunk[:4] + [None] if isinstance(body_chunk, list) and len(body_chunk) >= 5 and body_chunk[0] == InterpreterBase.METHOD_DEF
+        else body_chunk
+        for body_chunk in chunk
+    ]
+
+# Cache key of a program: its text, plus everything that decides what its entry holds and whether this Python can load it
+def program_hash(program: List[str]) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{PROGRAM_CACHE_VERSION}\n{marshal.version}\n".encode())
+    for line in program:
+        digest.update(line.encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+# A (parsed or resolved) program fragment in the form marshal can write, keeping line numbers and frame/field slots
+# An object used more than once (the same variable in a resolved body, or the same literal anywhere) is encoded once,
+# and marshal keeps it shared
+def encode(thing: any, encoded: Dict[any, tuple] | None = None) -> any:
+    if encoded is None:
+        encoded = dict()
+
+    if isinstance(thing, list):
+        items = [encode(part, encoded) for part in thing]
+        if isinstance(thing, Statement):
+            return (NODE, type(thing).__name__, thing.line_num, items)
+        return items
+    elif isinstance(thing, (LocalRef, FieldRef, Literal)):
+        # Literals are never assigned to, so equal ones can be shared too
+        key = str(thing) if isinstance(thing, Literal) else id(thing)
+        if key not in encoded:
+            if isinstance(thing, LocalRef):
+                encoded[key] = (LOCAL, str(thing), thing.index)
+            elif isinstance(thing, FieldRef):
+                encoded[key] = (FIELD, str(thing), thing.slot)
+            else:
+                encoded[key] = (LITERAL, str(thing), thing.raw_type.value, thing.raw_value)
+        return encoded[key]
+    elif isinstance(thing, StringWithLineNumber):
+        return (TOKEN, str(thing), thing.line_num)
+    else:
+        return thing
+
+# Rebuilds what encode gave, sharing an object wherever marshal shared its encoding
+def decode(thing: any, decoded: Dict[int, any] | None = None) -> any:
+    if decoded is None:
+        decoded = dict()
+
+    # Most tokens of a resolved body are plain strings, which need no decoding
+    if isinstance(thing, list):
+        return [part if type(part) is str else decode(part, decoded) for part in thing]
+    elif not isinstance(thing, tuple):
+        return thing
+
+    tag = thing[0]
+    if tag == TOKEN:
+        token = str.__new__(StringWithLineNumber, thing[1])     # Skips StringWithLineNumber.__new__, like the scanner
+        token.line_num = thing[2]
+        return token
+    elif tag == NODE:
+        return STATEMENT_CLASSES[thing[1]]([part if type(part) is str else decode(part, decoded) for part in thing[3]], thing[2])
+
+    if id(thing) not in decoded:
+        if tag == LOCAL:
+            decoded[id(thing)] = LocalRef(thing[1], thing[2])
+        elif tag == FIELD:
+            decoded[id(thing)] = FieldRef(thing[1], thing[2])
+        else:
+            decoded[id(thing)] = Literal(thing[1], Type(thing[2]), thing[3])
+    return decoded[id(thing)]
+
+# The contents of a cache entry, or None if it is missing or may not be loaded: only a regular file owned by this user
+# that no other user can write is trusted (checked on the opened file, so it cannot be swapped after the check)
+def read_entry(path: str) -> bytes | None:
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+    except OSError:
+        return None
+    with os.fdopen(fd, "rb") as f:
+        try:
+            entry_stat = os.fstat(fd)
+            if not stat.S_ISREG(entry_stat.st_mode) or entry_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+                return None
+            if hasattr(os, "getuid") and entry_stat.st_uid != os.getuid():
+                return None
+            return f.read()
+        except OSError:
+            return None
+
+# Writes a cache entry, readable and writable by this user only, creating the cache directory (private to this user)
+# if needed; gives back whether it was written
+# The entry is written to a new temporary file first, so another process never loads a partly written entry
+def write_entry(cache_dir: str, path: str, entry: bytes) -> bool:
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(entry)
+        os.replace(temp_path, path)
+    except OSError:
+        return False
+    return True
+
+# Removes the least recently used entries of a cache directory until they fit in max_bytes
+# Other processes may be reading, writing or evicting at the same time: an entry is only ever replaced or removed whole,
+# and one that is already gone is skipped
+def evict_entries(cache_dir: str, max_bytes: int):
+    entries: List[Tuple[float, int, str]] = []
+    try:
+        with os.scandir(cache_dir) as directory:
+            for dir_entry in directory:
+                if dir_entry.name.endswith(CACHE_ENTRY_SUFFIXES):
+                    try:
+                        stat = dir_entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, dir_entry.path))
+    except OSError:
+        return
+
+    total_bytes = sum(size for (_, size, _) in entries)
+    for _, size, path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total_bytes -= size
@@ -0,0 +1,179 @@
+from intbase import InterpreterBase
+from helperclasses import Begin, Call, FieldRef, If, Input, Let, Literal, LocalRef, Method, New, Operation, Print, Return, Set, Statement, Throw, Try, While
+import utils as utils
+
+import sys
+from typing import Dict, List
+
+# The node class of each kind of statement, by command (anything else is a plain Statement)
+STATEMENT_KINDS = {
+    InterpreterBase.BEGIN_DEF: Begin,
+    InterpreterBase.CALL_DEF: Call,
+    InterpreterBase.IF_DEF: If,
+    InterpreterBase.INPUT_INT_DEF: Input,
+    InterpreterBase.INPUT_STRING_DEF: Input,
+    InterpreterBase.PRINT_DEF: Print,
+    InterpreterBase.RETURN_DEF: Return,
+    InterpreterBase.SET_DEF: Set,
+    InterpreterBase.WHILE_DEF: While,
+    InterpreterBase.NEW_DEF: New,
+    InterpreterBase.LET_DEF: Let,
+    InterpreterBase.TRY_DEF: Try,
+    InterpreterBase.THROW_DEF: Throw,
+    **{operator: Operation for operator in ["+", "-", "*", "/", "%", "<", ">", "<=", ">=", "!=", "==", "&", "|", "!"]}
+}
+
+# Resolves every variable name in a method body to its address ahead of time
+#   Parameters and let/catch variables become LocalRefs: every scope gets its own block of slots in a single frame
+#   (the block starts right after its enclosing scope's block, so sibling scopes reuse the same slots)
+#   Fields of the defining class become FieldRefs holding the field's slot
+#   Literals become Literals holding their parsed type and value, so they are never parsed again
+#   Statements become Statement nodes of their kind, which hold their line number (see Statement)
+#   Anything else ("me", method and class names, unknown names) becomes a plain interned string, handled when the statement runs
+# Only statements keep a line number, so every use of a variable or literal shares one object (and names compare by identity)
+def resolve_method(method: Method, field_slots: Dict[str, int]) -> Method:
+    # Innermost scope is last
+    scopes: List[Dict[str, LocalRef]] = [
+        {param[1]: LocalRef(param[1], i) for i, param in enumerate(method.parameters)}
+    ]
+    frame_size = len(method.parameters)
+    next_free_slot = len(method.parameters)
+
+    # The shared FieldRefs and Literals, by name/token
+    field_refs: Dict[str, FieldRef] = dict()
+    literals: Dict[str, Literal] = dict()
+
+    def __resolve_name(name: any) -> any:
+        if isinstance(name, list):
+            return __resolve_statement(name)
+
+        for scope in reversed(scopes):
+            if name in scope:
+                return scope[name]
+
+        if name in field_slots:
+            if name not in field_refs:
+                field_refs[name] = FieldRef(name, field_slots[name])
+            return field_refs[name]
+        else:
+            return __symbol(name)
+
+    def __resolve_expression(expr: any) -> any:
+        if isinstance(expr, list):
+            return __resolve_statement(expr)
+        elif expr == InterpreterBase.ME_DEF:
+            return InterpreterBase.ME_DEF
+        elif expr in literals:
+            return literals[expr]
+
+        raw_type, raw_value = utils.parse_type_value(expr)
+        if raw_type is not None:
+            literal = literals[expr] = Literal(expr, raw_type, raw_value)
+            return literal
+        else:
+            return __resolve_name(expr)
+
+    def __symbol(name: any) -> any:
+        return sys.intern(str(name)) if isinstance(name, str) else name
+
+    # Runs resolve_in_scope inside a new innermost scope declaring var_names, and returns its result
+    def __with_scope(var_names: List[str], resolve_in_scope) -> any:
+        nonlocal frame_size, next_free_slot
+
+        scope: Dict[str, LocalRef] = dict()
+        scope_start = next_free_slot
+        for i, var_name in enumerate(var_names):
+            scope[var_name] = LocalRef(var_name, scope_start + i)
+
+        scopes.append(scope)
+        next_free_slot = scope_start + len(var_names)
+        frame_size = max(frame_size, next_free_slot)
+
+        resolved = resolve_in_scope(scope)
+
+        scopes.pop()
+        next_free_slot = scope_start
+        return resolved
+
+    # Statements become nodes of their kind (see Statement), holding the line number instead of their command
+    def __resolve_statement(statement: List[any]) -> List[any]:
+        if len(statement) == 0 or isinstance(statement[0], list):
+            return statement
+
+        # (Bodies can be resolved again, and a resolved body's commands no longer have line numbers)
+        command = statement[0]
+        line_num = statement.line_num if isinstance(statement, Statement) else command.line_num
+        resolved = __resolve_parts(statement, line_num)
+        return STATEMENT_KINDS.get(command, Statement)([sys.intern(str(command))] + resolved[1:], line_num)
+
+    def __resolve_parts(statement: List[any], line_num: int) -> List[any]:
+        command = statement[0]
+        match command:
+            # Format: [1] target object, [2] method name, [3...] arguments
+            case InterpreterBase.CALL_DEF:
+                if len(statement) < 3:
+                    return statement
+                target_obj = statement[1]
+                if target_obj != InterpreterBase.ME_DEF and target_obj != InterpreterBase.SUPER_DEF:
+                    target_obj = __resolve_name(target_obj)
+                else:
+                    target_obj = __symbol(target_obj)
+                return [command, target_obj, __symbol(statement[2])] + [__resolve_expression(arg) for arg in statement[3:]]
+
+            # Format: [1] variable name, [2] new value
+            case InterpreterBase.SET_DEF:
+                if len(statement) < 2:
+                    return statement
+                return [command, __resolve_name(statement[1])] + [__resolve_expression(expr) for expr in statement[2:]]
+
+            # Format: [1] variable name
+            case InterpreterBase.INPUT_INT_DEF | InterpreterBase.INPUT_STRING_DEF:
+                return [command] + [__resolve_name(var) for var in statement[1:]]
+
+            # Format: [1] class name
+            case InterpreterBase.NEW_DEF:
+                return [__symbol(part) for part in statement]
+
+            # Format: [1] declarations, each as [0] type, [1] name, [2] initial value (optional), [2...] substatements
+            case InterpreterBase.LET_DEF:
+                if len(statement) < 2:
+                    return statement
+                declared_vars = statement[1]
+                var_names = [dec_var[1] for dec_var in declared_vars]
+
+                def __resolve_let(scope: Dict[str, LocalRef]) -> List[any]:
+                    # A name declared twice keeps its plain name, which the let reports as a duplicate when it runs
+                    resolved_declarations = []
+                    seen_names = set()
+                    for dec_var, var_name in zip(declared_vars, var_names):
+                        if var_name in seen_names:
+                            resolved_declarations.append(dec_var)
+                        else:
+                            resolved_declarations.append([__symbol(dec_var[0]), scope[var_name]] + dec_var[2:])
+                        seen_names.add(var_name)
+
+                    return [command, resolved_declarations] + [__resolve_statement(substatement) for substatement in statement[2:]]
+
+                return __with_scope(var_names, __resolve_let)
+
+            # Format: [1] statement to try, [2] statement for catch
+            # Only the catch statement gets its own scope holding the "exception" variable, whose address is added as [3]
+            # (the statement to try sees the enclosing "exception", if it is inside another catch)
+            case InterpreterBase.TRY_DEF:
+                if len(statement) < 3:
+                    return [command] + [__resolve_expression(substatement) for substatement in statement[1:]]
+
+                try_statement = __resolve_expression(statement[1])
+
+                def __resolve_catch(scope: Dict[str, LocalRef]) -> List[any]:
+                    exception_var = scope[InterpreterBase.EXCEPTION_VARIABLE_DEF]
+                    return [command, try_statement, __resolve_expression(statement[2]), exception_var]
+
+                return __with_scope([InterpreterBase.EXCEPTION_VARIABLE_DEF], __resolve_catch)
+
+            # Everything else only contains expressions/statements after the command
+            case _:
+                return [command] + [__resolve_expression(expr) for expr in statement[1:]]
+
+    resolved_body = __resolve_expression(method.body)
+    return Method(method.name, method.return_type, method.parameters, resolved_body, frame_size)
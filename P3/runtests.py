@@ -0,0 +1,82 @@
+from helperclasses import Engine, Parser
+from interpreterv3 import Interpreter
+
+import contextlib
+import glob
+import os
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+TESTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests")
+
+# The Interpreter arguments of each mode the tests run in, by name, and whether the mode caches programs: each test then
+# runs twice in a new cache directory, once with a cold cache and once with a warm one
+MODES: Dict[str, Tuple[Dict[str, any], bool]] = {
+    "tree": ({"engine": Engine.TREE}, False),
+    "closure": ({"engine": Engine.CLOSURE}, False),
+    "vm": ({"engine": Engine.VM}, False),
+    "transpile": ({"engine": Engine.TRANSPILE}, True),
+    # Only the tree engine skips runtime type checks in programs the type checker verified
+    "type-check": ({"engine": Engine.TREE, "type_check": True}, False),
+    "regex": ({"engine": Engine.TREE, "parser": Parser.REGEX}, False),
+    "cache-programs": ({"engine": Engine.TREE, "cache_programs": True}, True),
+}
+
+# What a program gives: its output, or the type of the error it ends with (like the .exp files of the fail tests)
+# Trailing newlines are left out, as in the .exp files. An interpreter crash is given back as such, so it fails the test
+# Also gives back whether the program was loaded from the cache
+def run_program(program: List[str], interpreter_args: Dict[str, any]) -> Tuple[str, bool]:
+    interpreter = Interpreter(console_output=False, inp=[], **interpreter_args)
+    try:
+        interpreter.run(program)
+        result = "\n".join(interpreter.get_output()).rstrip("\n")
+    except Exception as e:
+        if interpreter.get_error_type_and_line()[0] is None:
+            result = f"crashed: {e!r}"
+        else:
+            result = str(interpreter.get_error_type_and_line()[0])
+    cache = interpreter.transpiled_program or interpreter.cached_program
+    return (result, cache is not None and cache.from_cache)
+
+# Runs every test in one mode, printing the ones that fail; gives back how many runs failed
+def run_mode(mode: str, tests: List[str]) -> int:
+    interpreter_args, caches_programs = MODES[mode]
+    runs = [f"{mode} (cold cache)", f"{mode} (warm cache)"] if caches_programs else [mode]
+    failed = 0
+    warm_hits = 0
+    with tempfile.TemporaryDirectory() if caches_programs else contextlib.nullcontext() as cache_dir:
+        if caches_programs:
+            interpreter_args = {**interpreter_args, "cache_dir": cache_dir}
+
+        for test in tests:
+            with open(test) as f:
+                program = f.read().splitlines()
+            with open(f"{test[:-len('.brewin')]}.exp") as f:
+                expected = f.read().rstrip("\n")
+
+            for run in runs:
+                result, from_cache = run_program(program, interpreter_args)
+                if from_cache and run != runs[0]:
+                    warm_hits += 1
+                if result != expected:
+                    failed += 1
+                    print(f"{run}: FAILED {os.path.basename(test)}\n  expected: {expected!r}\n  got:      {result!r}")
+
+    # Programs that end with an error before all their classes are built are never cached
+    cache_summary = f" ({warm_hits}/{len(tests)} warm runs loaded from the cache)" if caches_programs else ""
+    print(f"{mode}: {len(tests) * len(runs) - failed}/{len(tests) * len(runs)} passed{cache_summary}")
+    return failed
+
+# Runs each tests/*.brewin program that has a .exp file, in every mode (or the modes named), and compares what it gives
+# with its .exp file
+# python3 runtests.py [mode ...]
+if __name__ == "__main__":
+    modes = sys.argv[1:] or list(MODES)
+    for mode in modes:
+        if mode not in MODES:
+            sys.exit(f"Unknown mode '{mode}' (modes: {', '.join(MODES)})")
+
+    tests = [test for test in sorted(glob.glob(os.path.join(TESTS_DIR, "*.brewin"))) if os.path.exists(f"{test[:-len('.brewin')]}.exp")]
+    failed = sum(run_mode(mode, tests) for mode in modes)
+    sys.exit(1 if failed else 0)
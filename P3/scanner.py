@@ -0,0 +1,121 @@
+from bparser import BParser, StringWithLineNumber
+
+from contextlib import contextmanager
+import gc
+import re
+from typing import Iterable, Iterator, List, Tuple
+
+# Everything BParser.parse treats as a token, found in one pass over each line:
+#   a string (its closing quote is missing if the string is unclosed), a paren, the start of a comment,
+#   or a run of anything else up to a delimiter
+# Whitespace is the only thing left unmatched, which findall skips
+TOKEN_PATTERN = re.compile(r'"[^"]*"?|[()#]|[^ \t\r\n()"#]+')
+
+# Raised by parse_chunks for the errors that BParser.parse reports (with the same messages)
+class ParseError(Exception):
+    pass
+
+# Same result as BParser.parse (success flag, then the nested token lists or an error message),
+# but each line is split into tokens by TOKEN_PATTERN instead of character by character
+def parse(lines: Iterable[str]) -> Tuple[bool, List[any] | str]:
+    with cyclic_gc_paused():
+        try:
+            return True, list(parse_chunks(lines))
+        except ParseError as e:
+            return False, str(e)
+
+# Parses lines as they are read (from a list, a file object, etc.), giving back each top-level item
+# (a class definition's token lists, usually) as soon as it is complete
+# Errors are raised as ParseErrors once reached, so the items before them have already been given back
+def parse_chunks(lines: Iterable[str]) -> Iterator[List[any] | StringWithLineNumber]:
+    new_string = str.__new__    # Skips StringWithLineNumber.__new__, the slowest part of building each token
+    top_level = []              # Holds each top-level item until it is given back
+    output_stack = [top_level]
+    current = top_level
+    for line_no, line in enumerate(lines):
+        for token in TOKEN_PATTERN.findall(line):
+            first_char = token[0]
+            if first_char == BParser.OPEN_PAREN_CHAR:
+                nested = []
+                current.append(nested)
+                output_stack.append(nested)
+                current = nested
+            elif first_char == BParser.CLOSE_PAREN_CHAR:
+                if len(output_stack) < 2:
+                    raise ParseError("Extra closing parenthesis")
+                output_stack.pop()
+                current = output_stack[-1]
+                if current is top_level:
+                    yield top_level.pop()
+            elif first_char == BParser.COMMENT_CHAR:
+                break
+            elif first_char == BParser.QUOTE_CHAR and (len(token) == 1 or token[-1] != BParser.QUOTE_CHAR):
+                raise ParseError("Unclosed string")
+            else:
+                token = new_string(StringWithLineNumber, token)
+                token.line_num = line_no
+                current.append(token)
+                if current is top_level:
+                    yield top_level.pop()
+
+    if len(output_stack) > 1:
+        raise ParseError("Unclosed parenthesis")
+
+# Token lists hold no reference cycles, so while they are being built,
+# the cyclic garbage collector would only keep rescanning them as they grow
+@contextmanager
+def cyclic_gc_paused():
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+# Times both parsers on generated programs of growing size, checking that they agree
+# Usage: python3 scanner.py [largest number of lines]
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # Parse results are equal if their tokens are, line numbers included
+    def same_result(a: any, b: any) -> bool:
+        if isinstance(a, (list, tuple)):
+            return type(a) is type(b) and len(a) == len(b) and all(same_result(x, y) for x, y in zip(a, b))
+        return a == b and getattr(a, "line_num", None) == getattr(b, "line_num", None)
+
+    def generate_program(line_count: int) -> List[str]:
+        lines = ["(class main"]
+        method_count = 0
+        while len(lines) < line_count:
+            lines += [
+                f"  # Method number {method_count}",
+                f"  (method int method{method_count} ((int n) (string s))",
+                f"    (begin",
+                f"      (print \"(not a paren) # not a comment\" s n)",
+                f"      (if (< n {method_count}) (return (+ n 1)) (return (call me method{method_count} (- n 1) \"x\")))   # a comment",
+                f"    )",
+                f"  )",
+            ]
+            method_count += 1
+        return lines + ["  (method void main () (print \"done\"))", ")"]
+
+    largest = int(sys.argv[1]) if len(sys.argv) >= 2 else 100000
+    line_count = 1000
+    print(f"{'lines':>8} {'BParser':>10} {'scanner':>10} {'speedup':>8}")
+    while line_count <= largest:
+        program = generate_program(line_count)
+
+        start = time.perf_counter()
+        expected = BParser.parse(program)
+        bparser_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = parse(program)
+        scanner_time = time.perf_counter() - start
+
+        if not same_result(result, expected):
+            sys.exit(f"The parsers disagree on a program of {len(program)} lines")
+        print(f"{len(program):>8} {bparser_time:>9.3f}s {scanner_time:>9.3f}s {bparser_time / scanner_time:>7.1f}x")
+        line_count *= 10
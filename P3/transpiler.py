@@ -0,0 +1,608 @@
+from bparser import StringWithLineNumber
+from intbase import ErrorType, InterpreterBase
+from helperclasses import BrewinThrow, FALSE_FIELD, Field, FieldRef, Literal, LocalRef, Method, TRUE_FIELD, TailCall, Type, int_field, value_field
+from bytecode import EXPRESSION_COMMANDS, LetDeclarations
+from objdef import ObjectDefinition
+from programcache import DEFAULT_CACHE_DIR, MAX_CACHE_BYTES, evict_entries, read_entry, write_entry
+import compiler as compiler
+import resolver as resolver
+import utils as utils
+
+import dataclasses
+import hashlib
+import importlib.util
+import marshal
+import os
+from typing import Callable, Dict, List, Tuple
+
+# Bump whenever the generated code changes, so stale cache entries are never loaded
+TRANSPILER_VERSION = 6
+
+# The Python code for one program: the parsed program plus a function per method, compiled once and cached on disk
+# keyed by the program's text, so running the same program again skips both parsing and code generation
+class TranspiledProgram:
+    def __init__(self, program: List[str], interpreter: InterpreterBase, cache_dir: str | None = None):
+        self.__interpreter = interpreter
+        # Compiled programs go to the program cache's directory unless the interpreter is given a cache_dir
+        self.__cache_dir = cache_dir if cache_dir is not None else DEFAULT_CACHE_DIR
+        self.__cache_path = os.path.join(self.__cache_dir, f"{program_hash(program)}.code")
+        # Methods generated while the classes are built: (class, method, key, source), compiled together by finish()
+        self.__pending: List[Tuple[any, Method, Tuple[str, str, int], str]] | None = []
+        self.__method_count = 0
+
+        # What the generated code can see; the functions are rebuilt for every run, so they may refer to the interpreter
+        self.__namespace = {
+            "interpreter": interpreter,
+            "METHODS": dict(),
+            "S": StringWithLineNumber, "LocalRef": LocalRef, "FieldRef": FieldRef, "Literal": Literal, "LetDeclarations": LetDeclarations,
+            "Field": Field, "int_field": int_field, "value_field": value_field, "TRUE_FIELD": TRUE_FIELD, "FALSE_FIELD": FALSE_FIELD,
+            "ErrorType": ErrorType, "BrewinThrow": BrewinThrow, "ObjectDefinition": ObjectDefinition, "TailCall": TailCall,
+            "INT": Type.INT, "STRING": Type.STRING, "BOOL": Type.BOOL, "NULL": Type.NULL,
+            "OBJ": Type.OBJ, "TCLASS": Type.TCLASS, "EXCEPTION": Type.EXCEPTION,
+            "stringify": utils.stringify, "new_object": utils.new_object, "read_input": utils.read_input,
+            "check_let_declarations": utils.check_let_declarations,
+            "check_type": check_type, "check_comparison": check_comparison,
+            "check_operands_have_values": utils.check_operands_have_values
+        }
+        # (function, frame size) of every method compiled so far, by (class name, method name, overload index)
+        self.__methods: Dict[Tuple[str, str, int], Tuple[Callable, int]] = self.__namespace["METHODS"]
+
+        # None until the program has been parsed (BParser.parse) when it was not in the cache
+        self.parsed_program: List[any] | None = None
+        self.from_cache = self.__load()
+
+    # Resolves and compiles the index-th overload of a class's method
+    # If the cached code has it, its body is not even resolved. Otherwise it is generated now, and compiled by finish()
+    # while the classes are being built (compiled stays None until then) or right away once the program runs
+    def get_method(self, current_class: any, method: Method, index: int) -> Method:
+        key = (current_class.name, method.name, index)
+        if key in self.__methods:
+            compiled, frame_size = self.__methods[key]
+            return dataclasses.replace(method, frame_size=frame_size, compiled=compiled)
+
+        resolved_method = resolver.resolve_method(method, current_class.field_slots)
+        self.__method_count += 1
+        function_name = "".join(c if c.isalnum() else "_" for c in f"{current_class.name}_{method.name}") + f"_{self.__method_count}"
+        source = transpile_method(resolved_method, current_class, key, function_name)
+        if self.__pending is not None:
+            self.__pending.append((current_class, resolved_method, key, source))
+        else:
+            resolved_method.compiled = self.__compile_method(current_class, resolved_method, key, source)
+        return resolved_method
+
+    # Compiles every method generated while the classes were built, in one go, and caches them with the parsed program
+    # (template specializations are only built while the program runs, so they are generated again on every run)
+    def finish(self, parsed_program: List[any]):
+        pending, self.__pending = self.__pending, None
+        # Only the methods left out of the cached code (see __compile_method) are generated again
+        if self.from_cache:
+            for current_class, method, key, source in pending:
+                method.compiled = self.__compile_method(current_class, method, key, source)
+            return
+
+        module_source = f"PROGRAM = {python_literal(parsed_program)}\n\n" + "\n".join(source for (_, _, _, source) in pending)
+        try:
+            module_code = compile(module_source, "<brewin program>", "exec")
+        except (SyntaxError, RecursionError, MemoryError):
+            # Find the methods Python cannot compile, then cache the rest
+            for current_class, method, key, source in pending:
+                method.compiled = self.__compile_method(current_class, method, key, source)
+            pending = [entry for entry in pending if entry[2] in self.__methods]
+            module_source = f"PROGRAM = {python_literal(parsed_program)}\n\n" + "\n".join(source for (_, _, _, source) in pending)
+            try:
+                module_code = compile(module_source, "<brewin program>", "exec")
+            except (SyntaxError, RecursionError, MemoryError):
+                return      # The parsed program itself is nested too deeply, so the program is not cached
+
+        exec(module_code, self.__namespace)
+        for _, method, key, _ in pending:
+            method.compiled = self.__methods[key][0]
+
+        if write_entry(self.__cache_dir, self.__cache_path, marshal.dumps(module_code)):
+            evict_entries(self.__cache_dir, MAX_CACHE_BYTES)
+
+    # Methods Python cannot compile (nested too deeply) fall back to the closure compiler and are not cached
+    def __compile_method(self, current_class: any, method: Method, key: Tuple[str, str, int], source: str) -> Callable:
+        try:
+            exec(compile(source, f"<brewin {key[0]}.{key[1]}>", "exec"), self.__namespace)
+        except (SyntaxError, RecursionError, MemoryError):
+            return compiler.compile_method(method, current_class, self.__interpreter)
+        return self.__methods[key][0]
+
+    # Runs the cached code (if any, and only if it can be trusted: see read_entry), which defines PROGRAM and fills in METHODS
+    def __load(self) -> bool:
+        entry = read_entry(self.__cache_path)
+        if entry is None:
+            return False
+        try:
+            exec(marshal.loads(entry), self.__namespace)
+        except (EOFError, ValueError, TypeError):
+            self.__methods.clear()
+            return False
+
+        # A hit makes this entry the most recently used one (see evict_entries)
+        try:
+            os.utime(self.__cache_path)
+        except OSError:
+            pass
+
+        self.parsed_program = self.__namespace["PROGRAM"]
+        return True
+
+# Cache key of a program: its text, plus everything that decides what code is generated for it and whether
+# this Python can load that code
+def program_hash(program: List[str]) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{TRANSPILER_VERSION}\n".encode())
+    digest.update(importlib.util.MAGIC_NUMBER)
+    for line in program:
+        digest.update(line.encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+# Python source that rebuilds a (parsed or resolved) program fragment, keeping line numbers and frame/field slots
+def python_literal(thing: any) -> str:
+    if isinstance(thing, list):
+        return f"[{', '.join(python_literal(part) for part in thing)}]"
+    elif isinstance(thing, LocalRef):
+        return f"LocalRef({str(thing)!r}, {thing.index})"
+    elif isinstance(thing, FieldRef):
+        return f"FieldRef({str(thing)!r}, {thing.slot})"
+    elif isinstance(thing, Literal):
+        return f"Literal({str(thing)!r}, {thing.raw_type.name}, {thing.raw_value!r})"
+    elif isinstance(thing, StringWithLineNumber):
+        return f"S({str(thing)!r}, {thing.line_num!r})"
+    elif isinstance(thing, Type):
+        return thing.name
+    else:
+        return repr(thing)
+
+# Same rules (and messages) as utils.check_compatible_types, used once the generated code's fast path has failed
+def check_type(to_type: Type, to_obj_name: str | None, value_field: Field, message_prefix: str, line_num: int, interpreter: InterpreterBase):
+    if not utils.is_compatible_type(to_type, to_obj_name, value_field.type, value_field.obj_name, value_field.value, interpreter):
+        try:
+            utils.check_compatible_types(Field("temp", to_type, None, to_obj_name), value_field, interpreter)
+        except Exception as e:
+            interpreter.error(ErrorType.TYPE_ERROR, f"{message_prefix}: {str(e)}", line_num)
+
+# Operands of a comparison that are not two ints/strings/bools: objects may still be compared with == and !=
+def check_comparison(command: str, left: Field, right: Field, line_num: int, interpreter: InterpreterBase):
+    obj_null = [Type.NULL, Type.OBJ, Type.TCLASS]
+    if command in ["==", "!="] and left.type in obj_null and right.type in obj_null:
+        # If either object reference is a literal "null", allowed, so need not check for same type
+        # Else comparisons need to check for compatibility (only error if both ways are incompatible)
+        if left.type != Type.NULL and right.type != Type.NULL:
+            try:
+                utils.check_compatible_types(left, right, interpreter)
+            except RuntimeError:
+                try:
+                    utils.check_compatible_types(right, left, interpreter)
+                except RuntimeError as e:
+                    interpreter.error(ErrorType.TYPE_ERROR, f"Invalid type for operand '{right.name}': {str(e)}", line_num)
+    else:
+        interpreter.error(ErrorType.TYPE_ERROR, f"Operands of type '{left.type}' and '{right.type}' are incompatible with operator: {command}", line_num)
+
+ARITHMETIC_OPERATORS = {"+": "+", "-": "-", "*": "*", "/": "//", "%": "%"}
+COMPARISON_OPERATORS = {"<": "<", ">": ">", "<=": "<=", ">=": ">=", "==": "==", "!=": "!=", "&": "and", "|": "or"}
+COMPARISON_TYPES = {
+    "<": ["INT", "STRING"], ">": ["INT", "STRING"], "<=": ["INT", "STRING"], ">=": ["INT", "STRING"],
+    "==": ["INT", "STRING", "BOOL"], "!=": ["INT", "STRING", "BOOL"],
+    "&": ["BOOL"], "|": ["BOOL"]
+}
+
+# Generates the Python source of a function running a resolved method body: def function_name(frame) -> (return_initiated, return_field)
+# Fields are read and written straight from the receiver's slots, local variables from the frame's slots, every
+# value is held in a Python local, and a Brewin throw is a raised BrewinThrow (caught by try statements, like in the
+# other engines)
+# A returned call that returns the same type gives back a TailCall, which ObjectDefinition.run_call runs in the method's
+# place, unless it is inside a try statement (which has to catch what the call throws)
+# Running it behaves like ObjectDefinition's tree-walking executors (same output, same errors on the same lines)
+def transpile_method(method: Method, current_class: any, key: Tuple[str, str, int], function_name: str) -> str:
+    constants: Dict[str, str] = dict()      # Source of each module-level constant -> its name
+    lines: List[str] = []
+    indent = 1
+    temp_count = 0
+    try_depth = 0       # Number of try statements (with a catch) the code being generated is in
+
+    def __emit(line: str):
+        lines.append("    " * indent + line)
+
+    def __temp() -> str:
+        nonlocal temp_count
+        temp_count += 1
+        return f"t{temp_count}"
+
+    # Constants are built once, when the generated code is loaded
+    def __add_const(source: str) -> str:
+        if source not in constants:
+            constants[source] = f"{function_name}_k{len(constants)}"
+        return constants[source]
+
+    def __emit_error(error_type: ErrorType, message: str, line_num: int | None = None):
+        __emit(f"interpreter.error(ErrorType.{error_type.name}, {message!r}, {line_num!r})")
+
+    # Python blocks cannot be empty
+    def __emit_block(generate: Callable[[], None]):
+        nonlocal indent
+        indent += 1
+        block_start = len(lines)
+        generate()
+        if len(lines) == block_start:
+            __emit("pass")
+        indent -= 1
+
+    def __is_expression_statement(statement: List[any]) -> bool:
+        return len(statement) > 0 and isinstance(statement[0], str) and statement[0] in EXPRESSION_COMMANDS
+
+    # Fast path of a type check against a type known now: only objects need the full check
+    def __emit_check_type(to_type: Type, to_obj_name: str | None, value: str, message_prefix: str, line_num: int):
+        check = f"check_type({to_type.name}, {to_obj_name!r}, {value}, {message_prefix!r}, {line_num!r}, interpreter)"
+        if to_type in [Type.OBJ, Type.TCLASS]:
+            __emit(check)
+        else:
+            __emit(f"if {value}.type is not {to_type.name}:")
+            __emit_block(lambda: __emit(check))
+
+    # A local variable or field (no "me"); returns the name of the Python local holding its Field
+    def __variable(var_name: str, line_num: int) -> str:
+        value = __temp()
+        if isinstance(var_name, LocalRef):
+            __emit(f"{value} = frame_locals[{var_name.index}]")
+        elif isinstance(var_name, FieldRef):
+            declared_field = current_class.field_layout[var_name.slot]
+            __emit(f"{value} = Field({str(declared_field.name)!r}, {declared_field.type.name}, values[{var_name.slot}], {declared_field.obj_name!r})")
+        else:
+            __emit_error(ErrorType.NAME_ERROR, f"Unknown variable: {var_name}", line_num)
+            __emit(f"{value} = None")
+        return value
+
+    # A constant/literal, "me" or a variable
+    def __token(token: str, line_num: int) -> str:
+        if isinstance(token, Literal):
+            return __add_const(f"value_field({token.raw_type.name}, {token.raw_value!r})")
+        elif token == InterpreterBase.ME_DEF:
+            value = __temp()
+            __emit(f"{value} = Field('temp', OBJ, receiver, receiver.class_name)")
+            return value
+        else:
+            return __variable(token, line_num)
+
+    # The value of an operand/argument/predicate
+    def __expression(expr: any, line_num: int) -> str:
+        if isinstance(expr, list):
+            return __statement(expr, True)
+        else:
+            return __token(expr, line_num)
+
+    # If want_value is set, returns the Python expression holding the statement's value (its return field)
+    def __statement(statement: List[any], want_value: bool) -> str | None:
+        nonlocal indent
+        # A malformed statement only fails once it actually runs
+        statement_start = (len(lines), indent)
+        try:
+            value = __statement_unchecked(statement, want_value)
+        except (IndexError, TypeError, AttributeError) as e:
+            del lines[statement_start[0]:]
+            indent = statement_start[1]
+            __emit(f"raise {type(e).__name__}({str(e)!r})")
+            value = "None"
+        return value if want_value else None
+
+    def __statement_unchecked(statement: List[any], want_value: bool) -> str | None:
+        command = statement[0]
+        if __is_expression_statement(statement):
+            return __expression_statement(statement)
+
+        match command:
+            case InterpreterBase.BEGIN_DEF:
+                return __begin(statement[1:], want_value)
+
+            case InterpreterBase.IF_DEF:
+                return __if(statement.line_num, statement[1:], want_value)
+
+            case InterpreterBase.INPUT_INT_DEF | InterpreterBase.INPUT_STRING_DEF:
+                return __input(statement.line_num, command, statement[1])
+
+            case InterpreterBase.PRINT_DEF:
+                __print(statement.line_num, statement[1:])
+
+            case InterpreterBase.RETURN_DEF:
+                if len(statement) < 2:
+                    __emit("return (True, None)")
+                else:
+                    __return(statement.line_num, statement[1])
+
+            case InterpreterBase.SET_DEF:
+                __set(statement.line_num, statement[1], statement[2])
+
+            case InterpreterBase.WHILE_DEF:
+                __while(statement.line_num, statement[1], statement[2])
+
+            case InterpreterBase.LET_DEF:
+                declarations = __add_const(f"LetDeclarations({python_literal(statement[1])}, {statement.line_num!r})")
+                __emit(f"if {declarations}.checked is None:")
+                __emit_block(lambda: __emit(f"{declarations}.checked = check_let_declarations({declarations}.declared_vars, {declarations}.line_num, frame.current_class, interpreter)"))
+                __emit(f"for (local_index, var_name, var_type, init_value, obj_name) in {declarations}.checked:")
+                __emit_block(lambda: __emit("frame_locals[local_index] = Field(var_name, var_type, init_value, obj_name)"))
+                return __begin(statement[2:], want_value)
+
+            # [3] is the frame slot of the "exception" variable, added when resolving the method body
+            case InterpreterBase.TRY_DEF:
+                if len(statement) >= 3:
+                    return __try(statement[1], statement[2], statement[3], want_value)
+                return __statement(statement[1], want_value)
+
+            case InterpreterBase.THROW_DEF:
+                __throw(statement.line_num, statement[1])
+
+            case _:
+                __emit_error(ErrorType.SYNTAX_ERROR, f"Unknown statement/expression: {command}", statement.line_num)
+
+        return "None"
+
+    def __expression_statement(statement: List[any]) -> str:
+        command = statement[0]
+        line_num = statement.line_num
+        match command:
+            case InterpreterBase.CALL_DEF:
+                return __call(line_num, statement[1], statement[2], statement[3:])
+
+            case InterpreterBase.NEW_DEF:
+                value = __temp()
+                __emit(f"{value} = new_object({str(statement[1])!r}, {line_num!r}, interpreter)")
+                return value
+
+            case "!":
+                operand = __expression(statement[1], line_num)
+                if __may_be_none(statement[1]):
+                    __emit(f"check_operands_have_values('!', [{operand}], {str(statement[1])!r}, {line_num!r}, interpreter)")
+                # Unary NOT only works on booleans
+                __emit(f"if {operand}.type is not BOOL:")
+                __emit_block(lambda: __emit(
+                    f"interpreter.error(ErrorType.TYPE_ERROR, {repr(f'''The operator '!' is not compatible with the type of variable '{statement[1]}': ''')} + str({operand}.type), {line_num!r})"
+                ))
+                value = __temp()
+                __emit(f"{value} = FALSE_FIELD if {operand}.value else TRUE_FIELD")
+                return value
+
+            # Arithmetic and comparison operators
+            case _:
+                operands = statement[1:]
+                if len(operands) > 2:
+                    __emit_error(ErrorType.SYNTAX_ERROR, f"Invalid number of operands for operator: {command}", line_num)
+                    return "None"
+
+                operand_values = [__expression(operand, line_num) for operand in operands]
+                if len(operands) < 2:
+                    __emit("raise IndexError('list index out of range')")
+                    return "None"
+
+                left, right = operand_values
+                if any(__may_be_none(operand) for operand in operands):
+                    __emit(f"check_operands_have_values({command!r}, [{left}, {right}], None, {line_num!r}, interpreter)")
+                value = __temp()
+                type_error = f"interpreter.error(ErrorType.TYPE_ERROR, \"Operands of type '\" + str({left}.type) + \"' and '\" + str({right}.type) + \"' are incompatible with operator: {command}\", {line_num!r})"
+                if command in ARITHMETIC_OPERATORS:
+                    operator = ARITHMETIC_OPERATORS[command]
+                    # Operands can either be both strings (+) or both ints
+                    __emit(f"if {left}.type is INT and {right}.type is INT:")
+                    __emit_block(lambda: __emit(f"{value} = int_field({left}.value {operator} {right}.value)"))
+                    if command == "+":
+                        __emit(f"elif {left}.type is STRING and {right}.type is STRING:")
+                        __emit_block(lambda: __emit(f"{value} = value_field(STRING, {left}.value + {right}.value)"))
+                    __emit("else:")
+                    __emit_block(lambda: __emit(type_error))
+                else:
+                    operator = COMPARISON_OPERATORS[command]
+                    allowed_types = COMPARISON_TYPES[command]
+                    allowed = f"{left}.type is {allowed_types[0]}" if len(allowed_types) == 1 else f"{left}.type in ({', '.join(allowed_types)})"
+                    __emit(f"if {left}.type is not {right}.type or not {allowed}:")
+                    __emit_block(lambda: __emit(f"check_comparison({command!r}, {left}, {right}, {line_num!r}, interpreter)"))
+                    __emit(f"{value} = TRUE_FIELD if ({left}.value {operator} {right}.value) else FALSE_FIELD")
+                return value
+
+    def __begin(substatements: List[any], want_value: bool) -> str | None:
+        if len(substatements) == 0:
+            return "None"
+
+        for substatement in substatements[:-1]:
+            __statement(substatement, False)
+        return __statement(substatements[-1], want_value)
+
+    # Arguments are always evaluated before the target
+    # A call in return position (return_line_num: the line of the return statement) that returns the same type as this
+    # method returns a TailCall from the generated function instead of running
+    def __call(line_num: int, target_obj: any, method_name: str, method_args: List[any], return_line_num: int | None = None) -> str:
+        args = f"[{', '.join(__expression(arg, line_num) for arg in method_args)}]"
+        value = __temp()
+
+        call_args = f"{str(method_name)!r}, {args}, interpreter"
+        if isinstance(target_obj, list):
+            target = __statement(target_obj, True)
+            __emit(f"if not isinstance({target}.value, ObjectDefinition):")
+            __emit_block(lambda: __emit_error(ErrorType.TYPE_ERROR, "Expression does not return a class", line_num))
+            callee = f"{target}.value"
+        elif target_obj == InterpreterBase.ME_DEF:
+            callee = "receiver"
+        elif target_obj == InterpreterBase.SUPER_DEF:
+            if current_class.superclass is None:
+                __emit_error(ErrorType.TYPE_ERROR, f"Super class does not exist on class {current_class.name}", line_num)
+                return "None"
+            callee = "receiver"
+            call_args += ", frame.current_class.superclass"
+        else:
+            target = __variable(target_obj, line_num)
+            __emit(f"if {target}.value is None:")
+            __emit_block(lambda: __emit_error(ErrorType.FAULT_ERROR, f"Reference is null: {target_obj}", line_num))
+            callee = f"{target}.value"
+
+        if return_line_num is None:
+            __emit(f"{value} = {callee}.call_method({call_args})")
+        else:
+            method_to_call, callee_frame = __temp(), __temp()
+            return_type = __add_const(f"({method.return_type[0].name}, {method.return_type[1]!r})")
+            __emit(f"{method_to_call}, {callee_frame} = {callee}.prepare_call({call_args})")
+            __emit(f"if {method_to_call}.return_type == {return_type}:")
+            __emit_block(lambda: __emit(f"return (True, TailCall({method_to_call}, {callee_frame}, {return_line_num!r}))"))
+            __emit(f"{value} = ObjectDefinition.run_call({method_to_call}, {callee_frame}, interpreter)")
+
+        return value
+
+    def __if(line_num: int, args: List[any], want_value: bool) -> str | None:
+        if len(args) != 2 and len(args) != 3:
+            __emit_error(ErrorType.SYNTAX_ERROR, "Too few or too many arguments for if statement", line_num)
+            return "None"
+
+        predicate = __expression(args[0], line_num)
+        __emit_predicate_check(predicate, args[0], line_num)
+
+        value = __temp()
+        def __clause(clause: List[any] | None):
+            clause_value = __statement(clause, want_value) if clause is not None else "None"
+            if want_value:
+                __emit(f"{value} = {clause_value}")
+
+        __emit(f"if {predicate}.value:")
+        __emit_block(lambda: __clause(args[1]))
+        if len(args) == 3 or want_value:
+            __emit("else:")
+            __emit_block(lambda: __clause(args[2] if len(args) == 3 else None))
+        return value
+
+    # Only statements that are not expressions can have no value
+    def __may_be_none(expr: any) -> bool:
+        return isinstance(expr, list) and not __is_expression_statement(expr)
+
+    def __emit_predicate_check(predicate: str, predicate_expr: any, line_num: int):
+        if __may_be_none(predicate_expr):
+            __emit(f"if {predicate} is None:")
+            __emit_block(lambda: __emit_error(ErrorType.TYPE_ERROR, "Predicate cannot return null", line_num))
+        __emit(f"if {predicate}.type is not BOOL:")
+        __emit_block(lambda: __emit_error(ErrorType.TYPE_ERROR, "Predicate is not a boolean", line_num))
+
+    def __while(line_num: int, predicate_expr: any, true_clause: List[any]):
+        def __loop():
+            predicate = __expression(predicate_expr, line_num)
+            __emit_predicate_check(predicate, predicate_expr, line_num)
+            __emit(f"if not {predicate}.value:")
+            __emit_block(lambda: __emit("break"))
+            __statement(true_clause, False)
+
+        __emit("while True:")
+        __emit_block(__loop)
+
+    def __input(line_num: int, command: str, var: str) -> str:
+        if not isinstance(var, LocalRef) and not isinstance(var, FieldRef):
+            __emit_error(ErrorType.NAME_ERROR, f"Unknown variable: {var}", line_num)
+            return "None"
+
+        value = __temp()
+        input_info = __add_const(f"({str(command)!r}, {python_literal(var)})")
+        __emit(f"{value} = read_input({input_info}, frame, {line_num!r}, interpreter)")
+        return value
+
+    def __print(line_num: int, stuff_to_print: List[any]):
+        parts = []
+        for expression in stuff_to_print:
+            if isinstance(expression, Literal):
+                # Literals are stringified now
+                parts.append(repr(utils.stringify(Field("temp", expression.raw_type, expression.raw_value))))
+            else:
+                parts.append(f"stringify({__expression(expression, line_num)})")
+
+        __emit(f"interpreter.output({' + '.join(parts) if len(parts) > 0 else repr('')})")
+
+    def __return(line_num: int, expr: any):
+        # A void method should not return anything
+        if method.return_type[0] == Type.NULL:
+            __emit_error(ErrorType.TYPE_ERROR, "Invalid return type: void method cannot return anything", line_num)
+            return
+
+        # A returned call may run in place of this method (see run_call), which then does the type check below
+        if try_depth == 0 and isinstance(expr, list) and len(expr) >= 3 and expr[0] == InterpreterBase.CALL_DEF:
+            value = __call(expr.line_num, expr[1], expr[2], expr[3:], line_num)
+        else:
+            value = __expression(expr, line_num)
+        __emit_check_type(method.return_type[0], method.return_type[1], value, "Invalid return type", line_num)
+        __emit(f"return (True, {value})")
+
+    # The new value is evaluated first
+    def __set(line_num: int, var_name: str, new_val: any):
+        if isinstance(new_val, list):
+            new_value = __statement(new_val, True)
+        elif isinstance(new_val, Literal):
+            new_value = __token(new_val, line_num)
+        else:
+            new_value = __variable(new_val, line_num)
+
+        if __may_be_none(new_val):
+            __emit(f"if {new_value} is None:")
+            __emit_block(lambda: __emit_error(ErrorType.TYPE_ERROR, "Cannot set variable to result of void function", line_num))
+
+        message_prefix = f"Invalid type for variable '{var_name}'"
+        if isinstance(var_name, LocalRef):
+            # A variable keeps its declared type, even when set to null
+            field_to_be_set = __temp()
+            __emit(f"{field_to_be_set} = frame_locals[{var_name.index}]")
+            __emit(f"if {new_value}.type is not {field_to_be_set}.type or {field_to_be_set}.type is OBJ or {field_to_be_set}.type is TCLASS:")
+            __emit_block(lambda: __emit(f"check_type({field_to_be_set}.type, {field_to_be_set}.obj_name, {new_value}, {message_prefix!r}, {line_num!r}, interpreter)"))
+            __emit(f"{field_to_be_set}.value = {new_value}.value")
+        elif isinstance(var_name, FieldRef):
+            declared_field = current_class.field_layout[var_name.slot]
+            __emit_check_type(declared_field.type, declared_field.obj_name, new_value, message_prefix, line_num)
+            __emit(f"values[{var_name.slot}] = {new_value}.value")
+        else:
+            __emit_error(ErrorType.NAME_ERROR, f"Unknown variable: {var_name}", line_num)
+
+    def __try(try_statement: any, catch_statement: any, exception_var: LocalRef, want_value: bool) -> str | None:
+        value = __temp()
+        def __clause(clause: List[any]):
+            clause_value = __statement(clause, want_value)
+            if want_value:
+                __emit(f"{value} = {clause_value}")
+
+        def __catch():
+            # Add a local var 'exception' that contains the thrown message
+            __emit(f"frame_locals[{exception_var.index}] = Field({InterpreterBase.EXCEPTION_VARIABLE_DEF!r}, STRING, thrown.exception_field.value, None)")
+            __clause(catch_statement)
+
+        def __try_clause():
+            nonlocal try_depth
+            try_depth += 1
+            __clause(try_statement)
+            try_depth -= 1
+
+        __emit("try:")
+        __emit_block(__try_clause)
+        __emit("except BrewinThrow as thrown:")
+        __emit_block(__catch)
+        return value
+
+    def __throw(line_num: int, exception_msg: any):
+        if isinstance(exception_msg, Literal) and exception_msg.raw_type != Type.STRING and exception_msg.raw_type != Type.EXCEPTION:
+            __emit_error(ErrorType.TYPE_ERROR, f"Cannot throw object of type '{exception_msg.raw_type}', expected 'Type.STRING'")
+            return
+
+        message = __expression(exception_msg, line_num)
+        __emit(f"if {message}.type is not STRING:")
+        __emit_block(lambda: __emit(f"interpreter.error(ErrorType.TYPE_ERROR, \"Cannot throw object of type '\" + str({message}.type) + \"', expected 'Type.STRING'\")"))
+        __emit(f"raise BrewinThrow(Field('temp', EXCEPTION, {message}.value, None))")
+
+    # The body's value is what the method returns if it ends without a "return"
+    body_value = __statement(method.body, True)
+    __emit(f"return (False, {body_value})")
+
+    return "\n".join(
+        [f"{name} = {source}" for source, name in constants.items()] +
+        [
+            f"def {function_name}(frame):",
+            "    receiver = frame.receiver",
+            "    values = receiver.values",
+            "    frame_locals = frame.locals"
+        ] +
+        lines +
+        [
+            f"METHODS[({str(key[0])!r}, {str(key[1])!r}, {key[2]})] = ({function_name}, {method.frame_size})",
+            ""
+        ]
+    )
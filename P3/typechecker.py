@@ -0,0 +1,600 @@
+from intbase import ErrorType, InterpreterBase
+from helperclasses import FieldRef, Literal, LocalRef, Method, Type
+import resolver as resolver
+import utils as utils
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, NamedTuple, Set, Tuple
+
+# Static type checking of a whole program, done once all classes are built
+#   Every method body of every class (and of every template specialization the program can create) is walked once,
+#   computing the static type of each expression the same way the tree-walking executors compute the runtime one
+#   A type check that fails whenever it runs is reported as a TypeDiagnostic, with the executor's error type and message
+#   A program is verified if every runtime type check (set, return, parameters, predicates, operands and throw) is proven
+#   to pass, so the interpreter can skip them all while it runs (see Interpreter.verified)
+# Anything that cannot be told ahead of time (e.g. an overload picked by the runtime class of an argument) leaves the
+# program unverified instead, so it runs with the usual runtime checks
+
+# The static type of a value
+#   obj_name: the declared class of an object
+#   exact: False if the Field may carry a subclass of obj_name instead ("me", method results)
+class StaticType(NamedTuple):
+    type: Type | None
+    obj_name: str | None = None
+    exact: bool = True
+
+UNKNOWN = StaticType(None, "unknown")   # Cannot be told ahead of time
+NEVER = StaticType(None, "never")       # No value is ever produced (the code throws or returns instead)
+# Statements without a value (print, set, while, ...) are typed None, just like the Field they give back
+
+# What running a statement gives back: the value when it completes normally, and the value when it issues a return
+class Outcome(NamedTuple):
+    normal: StaticType | None
+    returned: StaticType | None
+
+# The class whose method body is being checked, and the static types of the method's frame slots
+class MethodContext(NamedTuple):
+    owner: any
+    local_types: List[StaticType | None]
+
+@dataclass
+class TypeDiagnostic:
+    error_type: ErrorType
+    message: str
+    line_num: int | None
+
+@dataclass
+class TypeCheckResult:
+    errors: List[TypeDiagnostic]
+    verified: bool
+
+OBJECT_TYPES = [Type.OBJ, Type.TCLASS]
+ORDERING_OPERATORS = ["<", ">", "<=", ">="]
+EQUALITY_OPERATORS = ["==", "!="]
+BOOLEAN_OPERATORS = ["&", "|"]
+
+def check_program(interpreter: InterpreterBase) -> TypeCheckResult:
+    return TypeChecker(interpreter).check()
+
+# The type a value has in either of two places (e.g. the branches of an if)
+def join(first: StaticType | None, second: StaticType | None) -> StaticType | None:
+    if first is NEVER:
+        return second
+    elif second is NEVER or first == second:
+        return first
+    elif first is not None and second is not None and first.type in OBJECT_TYPES and second.type in OBJECT_TYPES and first.obj_name == second.obj_name:
+        return StaticType(Type.OBJ, first.obj_name, False)
+    else:
+        return UNKNOWN
+
+class TypeChecker:
+    # Maximum number of template specializations created for checking (more leaves the program unverified)
+    MAX_SPECIALIZATIONS = 256
+    # Maximum number of passes spent on recursive methods whose result type differs from their declared type
+    MAX_PASSES = 8
+
+    def __init__(self, interpreter: InterpreterBase):
+        self.interpreter = interpreter
+
+        # Every class, and every class an object of a given class may actually be (itself and all its subclasses)
+        self.__classes = [interpreter.get_class(class_name) for class_name in interpreter.get_valid_class_list()]
+        self.__subclasses: Dict[str, List[any]] = dict()
+        for class_def in self.__classes:
+            for ancestor in class_def.ancestors:
+                self.__subclasses.setdefault(ancestor, []).append(class_def)
+
+        # Specializations by name, along with the error creating them reports (either may be None)
+        self.__specializations: Dict[str, Tuple[any, TypeDiagnostic | None]] = dict()
+
+        # Result types of recursive methods, settled by an earlier pass
+        self.__pinned_results: Dict[int, StaticType] = dict()
+
+    def check(self) -> TypeCheckResult:
+        try:
+            for _ in range(TypeChecker.MAX_PASSES):
+                self.__check_pass()
+                if not self.__wrong_assumptions:
+                    errors = sorted(self.__errors, key=lambda error: (error.line_num is None, error.line_num or 0))
+                    return TypeCheckResult(errors, self.__verified and not errors)
+
+                self.__pinned_results.update(self.__wrong_assumptions)
+        except RecursionError:
+            pass
+
+        # Give up on verifying, but never report errors that might not be real
+        return TypeCheckResult([], False)
+
+    def __check_pass(self):
+        self.__errors: List[TypeDiagnostic] = []
+        self.__verified = True
+        self.__method_results: Dict[int, StaticType] = dict()   # Keyed by id(method)
+        self.__in_progress: Set[int] = set()
+        self.__assumed: Set[int] = set()
+        self.__wrong_assumptions: Dict[int, StaticType] = dict()
+
+        # Specializations found while checking are appended to the worklist
+        self.__worklist = list(self.__classes) + [specialization for (specialization, _) in self.__specializations.values() if specialization is not None]
+        i = 0
+        while i < len(self.__worklist):
+            class_def = self.__worklist[i]
+            for method_list in class_def.methods.values():
+                for method in method_list:
+                    self.__check_method(class_def, method)
+            i += 1
+
+    def __report(self, error_type: ErrorType, message: str, line_num: int | None):
+        self.__errors.append(TypeDiagnostic(error_type, message, line_num))
+
+    def __unverified(self):
+        self.__verified = False
+
+    # Checks a method's body (once) and returns the type of what calling it gives back
+    def __check_method(self, owner: any, method: Method) -> StaticType:
+        method_key = id(method)
+        if method_key in self.__method_results:
+            return self.__method_results[method_key]
+
+        return_type = method.return_type
+        declared_result = StaticType(Type.OBJ, return_type[1], False) if return_type[0] in OBJECT_TYPES else StaticType(return_type[0])
+
+        # A recursive call assumes the declared type, which is checked once the body is done
+        if method_key in self.__in_progress:
+            self.__assumed.add(method_key)
+            return self.__pinned_results.get(method_key, declared_result)
+
+        self.__in_progress.add(method_key)
+
+        # Bodies are resolved again, since the transpiler does not keep the resolved bodies of cached methods
+        resolved_method = resolver.resolve_method(method, owner.field_slots)
+        local_types: List[StaticType | None] = [None] * resolved_method.frame_size
+        for i, param in enumerate(method.parameters):
+            local_types[i] = StaticType(param[0], param[2])
+
+        body_outcome = self.__outcome(MethodContext(owner, local_types), return_type, resolved_method.body)
+
+        # Returned values were checked against the declared type (no value gives back the default value)
+        # Falling off the end gives back the last statement's value (unchecked) unless it has none
+        # A body that always throws gives back nothing at all
+        result = NEVER if body_outcome.returned is NEVER else declared_result
+        fall_through = body_outcome.normal
+        if fall_through is None or fall_through is NEVER:
+            result = join(result, NEVER if fall_through is NEVER else declared_result)
+        elif fall_through is not UNKNOWN and (fall_through.type == Type.NULL or self.__assignable(return_type[0], return_type[1], fall_through) is True):
+            result = join(result, declared_result)
+        else:
+            result = UNKNOWN
+
+        self.__in_progress.discard(method_key)
+        if method_key in self.__assumed and result != self.__pinned_results.get(method_key, declared_result):
+            self.__wrong_assumptions[method_key] = result
+
+        self.__method_results[method_key] = result
+        return result
+
+    def __outcome(self, context: MethodContext, return_type: Tuple[Type, str | None] | None, expr: any) -> Outcome:
+        if isinstance(expr, list):
+            try:
+                return self.__statement(context, return_type, expr)
+            # Malformed statements fail the same way whether or not the program is verified
+            except (IndexError, TypeError, AttributeError):
+                return Outcome(UNKNOWN, UNKNOWN)
+        else:
+            return Outcome(self.__name_type(context, expr), NEVER)
+
+    # The value of an expression, whether or not a return was issued while evaluating it
+    def __value(self, context: MethodContext, return_type: Tuple[Type, str | None] | None, expr: any) -> StaticType | None:
+        outcome = self.__outcome(context, return_type, expr)
+        return join(outcome.normal, outcome.returned)
+
+    def __name_type(self, context: MethodContext, name: any) -> StaticType:
+        if isinstance(name, Literal):
+            return StaticType(name.raw_type)
+        elif isinstance(name, LocalRef):
+            local_type = context.local_types[name.index]
+            return local_type if local_type is not None else UNKNOWN
+        elif isinstance(name, FieldRef):
+            declared_field = context.owner.field_layout[name.slot]
+            return StaticType(declared_field.type, declared_field.obj_name)
+        elif name == InterpreterBase.ME_DEF:
+            return StaticType(Type.OBJ, context.owner.name, False)
+        else:
+            return UNKNOWN
+
+    def __statement(self, context: MethodContext, return_type: Tuple[Type, str | None] | None, statement: List[any]) -> Outcome:
+        command = statement[0]
+        line_num = statement.line_num
+        match command:
+            case InterpreterBase.BEGIN_DEF:
+                return self.__sequence(context, return_type, statement[1:])
+
+            case InterpreterBase.CALL_DEF:
+                return Outcome(self.__call(context, line_num, statement[1], statement[2], statement[3:]), NEVER)
+
+            case InterpreterBase.IF_DEF:
+                if len(statement) != 3 and len(statement) != 4:
+                    return Outcome(UNKNOWN, UNKNOWN)
+
+                predicate = self.__value(context, None, statement[1])
+                if predicate is None:
+                    self.__report(ErrorType.TYPE_ERROR, "Predicate cannot return null", line_num)
+                else:
+                    self.__check_predicate(predicate, line_num)
+
+                true_outcome = self.__outcome(context, return_type, statement[2])
+                false_outcome = self.__outcome(context, return_type, statement[3]) if len(statement) == 4 else Outcome(None, NEVER)
+                return Outcome(join(true_outcome.normal, false_outcome.normal), join(true_outcome.returned, false_outcome.returned))
+
+            case InterpreterBase.WHILE_DEF:
+                predicate = self.__value(context, None, statement[1])
+                if predicate is None:
+                    self.__report(ErrorType.TYPE_ERROR, "Predicate is not a boolean", line_num)
+                else:
+                    self.__check_predicate(predicate, line_num)
+
+                body_outcome = self.__outcome(context, return_type, statement[2])
+                return Outcome(None, body_outcome.returned)
+
+            case InterpreterBase.INPUT_INT_DEF | InterpreterBase.INPUT_STRING_DEF:
+                var_type = self.__name_type(context, statement[1])
+                return Outcome(StaticType(var_type.type) if var_type.type in [Type.INT, Type.STRING] else UNKNOWN, NEVER)
+
+            case InterpreterBase.PRINT_DEF:
+                for expr in statement[1:]:
+                    if isinstance(expr, list):
+                        self.__outcome(context, return_type, expr)
+                return Outcome(None, NEVER)
+
+            case InterpreterBase.RETURN_DEF:
+                if len(statement) < 2:
+                    return Outcome(NEVER, None)
+
+                if return_type is not None and return_type[0] == Type.NULL:
+                    self.__report(ErrorType.TYPE_ERROR, "Invalid return type: void method cannot return anything", line_num)
+                    return Outcome(NEVER, NEVER)
+
+                returned = self.__value(context, return_type, statement[1])
+                if return_type is not None:
+                    self.__check_assignment(return_type[0], return_type[1], returned, "Invalid return type", line_num)
+                return Outcome(NEVER, returned)
+
+            case InterpreterBase.SET_DEF:
+                var_name = statement[1]
+                new_val = statement[2]
+
+                # "me" cannot be assigned (it is looked up as a variable)
+                new_type = UNKNOWN if new_val == InterpreterBase.ME_DEF else self.__value(context, return_type, new_val)
+                if new_type is None:
+                    self.__report(ErrorType.TYPE_ERROR, "Cannot set variable to result of void function", line_num)
+                elif isinstance(var_name, LocalRef) or isinstance(var_name, FieldRef):
+                    var_type = self.__name_type(context, var_name)
+                    self.__check_assignment(var_type.type, var_type.obj_name, new_type, f"Invalid type for variable '{var_name}'", line_num)
+                return Outcome(None, NEVER)
+
+            case InterpreterBase.NEW_DEF:
+                class_name = statement[1]
+                if self.interpreter.get_class(class_name) is None:
+                    if class_name.find('@') == -1 or self.interpreter.get_tclass(class_name.split('@')[0]) is None:
+                        self.__report(ErrorType.TYPE_ERROR, f"Unknown class: {class_name}", line_num)
+                        return Outcome(NEVER, NEVER)
+
+                    specialization, error = self.__specialization(class_name, line_num)
+                    if specialization is None:
+                        if error is not None:
+                            self.__report(error.error_type, error.message, error.line_num)
+                        return Outcome(NEVER, NEVER)
+
+                return Outcome(StaticType(Type.OBJ, class_name), NEVER)
+
+            case "+" | "-" | "*" | "/" | "%":
+                if len(statement) > 3:
+                    return Outcome(UNKNOWN, UNKNOWN)
+
+                left, right = [self.__value(context, None, arg) for arg in statement[1:3]]
+                if (operands_type := self.__operands_type(command, left, right, line_num)) is not None:
+                    return Outcome(operands_type, NEVER)
+
+                if command == "+" and left.type == Type.STRING and right.type == Type.STRING:
+                    return Outcome(StaticType(Type.STRING), NEVER)
+                elif left.type == Type.INT and right.type == Type.INT:
+                    return Outcome(StaticType(Type.INT), NEVER)
+                else:
+                    self.__report(ErrorType.TYPE_ERROR, f"Operands of type '{left.type}' and '{right.type}' are incompatible with operator: {command}", line_num)
+                    return Outcome(NEVER, NEVER)
+
+            case "<" | ">" | "<=" | ">=" | "!=" | "==" | "&" | "|":
+                if len(statement) > 3:
+                    return Outcome(UNKNOWN, UNKNOWN)
+
+                left, right = [self.__value(context, None, arg) for arg in statement[1:3]]
+                if (operands_type := self.__operands_type(command, left, right, line_num)) is not None:
+                    return Outcome(operands_type, NEVER)
+
+                if command in ORDERING_OPERATORS and left.type == right.type and left.type in [Type.INT, Type.STRING]:
+                    pass
+                elif command in EQUALITY_OPERATORS and left.type == right.type and left.type in [Type.INT, Type.STRING, Type.BOOL]:
+                    pass
+                elif command in EQUALITY_OPERATORS and left.type in OBJECT_TYPES + [Type.NULL] and right.type in OBJECT_TYPES + [Type.NULL]:
+                    if left.type != Type.NULL and right.type != Type.NULL:
+                        comparable = self.__comparable(left, right)
+                        if comparable is None:
+                            self.__unverified()
+                        elif not comparable:
+                            operand_name = statement[2] if not isinstance(statement[2], list) else "temp"
+                            self.__report(ErrorType.TYPE_ERROR, f"Invalid type for operand '{operand_name}': {self.__mismatch_message(right.type, right.obj_name, left)}", line_num)
+                            return Outcome(NEVER, NEVER)
+                elif command in BOOLEAN_OPERATORS and left.type == Type.BOOL and right.type == Type.BOOL:
+                    pass
+                else:
+                    self.__report(ErrorType.TYPE_ERROR, f"Operands of type '{left.type}' and '{right.type}' are incompatible with operator: {command}", line_num)
+                    return Outcome(NEVER, NEVER)
+
+                return Outcome(StaticType(Type.BOOL), NEVER)
+
+            case "!":
+                operand = self.__value(context, None, statement[1])
+                if operand is None:
+                    self.__report(ErrorType.TYPE_ERROR, f"The operator '!' is not compatible with the type of variable '{statement[1]}': None", line_num)
+                    return Outcome(NEVER, NEVER)
+                elif operand is NEVER:
+                    return Outcome(NEVER, NEVER)
+                elif operand is UNKNOWN:
+                    self.__unverified()
+                elif operand.type != Type.BOOL:
+                    self.__report(ErrorType.TYPE_ERROR, f"The operator '!' is not compatible with the type of variable '{statement[1]}': {operand.type}", line_num)
+                    return Outcome(NEVER, NEVER)
+                return Outcome(StaticType(Type.BOOL), NEVER)
+
+            case InterpreterBase.LET_DEF:
+                declared_vars = statement[1]
+                declarations = self.__guarded(lambda: utils.check_let_declarations(declared_vars, line_num, context.owner, self.interpreter))
+                if declarations is None:
+                    return Outcome(NEVER, NEVER)
+
+                for (index, _, var_type, _, obj_name) in declarations:
+                    context.local_types[index] = StaticType(var_type, obj_name)
+                return self.__sequence(context, return_type, statement[2:])
+
+            case InterpreterBase.TRY_DEF:
+                try_outcome = self.__outcome(context, return_type, statement[1])
+                if len(statement) < 4:
+                    return try_outcome
+
+                context.local_types[statement[3].index] = StaticType(Type.STRING)
+                catch_outcome = self.__outcome(context, return_type, statement[2])
+                return Outcome(join(try_outcome.normal, catch_outcome.normal), join(try_outcome.returned, catch_outcome.returned))
+
+            case InterpreterBase.THROW_DEF:
+                thrown = self.__value(context, return_type, statement[1])
+                if thrown is UNKNOWN:
+                    self.__unverified()
+                elif thrown is not None and thrown is not NEVER and thrown.type != Type.STRING:
+                    self.__report(ErrorType.TYPE_ERROR, f"Cannot throw object of type '{thrown.type}', expected 'Type.STRING'", line_num)
+                return Outcome(NEVER, NEVER)
+
+            case _:
+                return Outcome(UNKNOWN, UNKNOWN)
+
+    def __sequence(self, context: MethodContext, return_type: Tuple[Type, str | None] | None, substatements: List[any]) -> Outcome:
+        if len(substatements) == 0:
+            return Outcome(UNKNOWN, UNKNOWN)
+
+        returned = NEVER
+        completes = True
+        for substatement in substatements:
+            outcome = self.__outcome(context, return_type, substatement)
+            returned = join(returned, outcome.returned)
+            completes = completes and outcome.normal is not NEVER
+
+        return Outcome(outcome.normal if completes else NEVER, returned)
+
+    # The type of an operator's result when it is decided by its operands alone, or None if the operator decides it
+    # A statement without a value is never a valid operand
+    def __operands_type(self, command: str, left: StaticType | None, right: StaticType | None, line_num: int) -> StaticType | None:
+        if left is NEVER or right is NEVER:
+            return NEVER
+        elif left is None or right is None:
+            left_type, right_type = [operand.type if operand is not None else None for operand in [left, right]]
+            self.__report(ErrorType.TYPE_ERROR, f"Operands of type '{left_type}' and '{right_type}' are incompatible with operator: {command}", line_num)
+            return NEVER
+        elif left is UNKNOWN or right is UNKNOWN:
+            self.__unverified()
+            return UNKNOWN
+        else:
+            return None
+
+    def __check_predicate(self, predicate: StaticType, line_num: int):
+        if predicate is UNKNOWN:
+            self.__unverified()
+        elif predicate is not NEVER and predicate.type != Type.BOOL:
+            self.__report(ErrorType.TYPE_ERROR, "Predicate is not a boolean", line_num)
+
+    def __check_assignment(self, to_type: Type, to_obj_name: str | None, value: StaticType | None, message_prefix: str, line_num: int):
+        if value is None or value is NEVER:
+            return
+        elif value is UNKNOWN:
+            self.__unverified()
+            return
+
+        match self.__assignable(to_type, to_obj_name, value):
+            case None:
+                self.__unverified()
+            case False:
+                self.__report(ErrorType.TYPE_ERROR, f"{message_prefix}: {self.__mismatch_message(to_type, to_obj_name, value)}", line_num)
+
+    # Whether a value of the given type can always (True) or never (False) be stored in a variable of the given type
+    # None if that depends on the value's runtime class
+    def __assignable(self, to_type: Type, to_obj_name: str | None, value: StaticType) -> bool | None:
+        if to_type in OBJECT_TYPES:
+            if value.type == Type.NULL:
+                return True
+            elif value.type in OBJECT_TYPES:
+                return self.__is_subclass(value.obj_name, to_obj_name)
+            else:
+                return False
+        else:
+            return to_type == value.type
+
+    # Whether class_name always (True) or never (False) inherits from ancestor_name
+    # None if it is the other way around (only an object of a subclass would do) or either class is unknown
+    def __is_subclass(self, class_name: str, ancestor_name: str) -> bool | None:
+        if class_name == ancestor_name:
+            return True
+
+        class_ancestors = self.__ancestors(class_name)
+        ancestor_ancestors = self.__ancestors(ancestor_name)
+        if class_ancestors is None or ancestor_ancestors is None:
+            return None
+        elif ancestor_name in class_ancestors:
+            return True
+        elif class_name in ancestor_ancestors:
+            return None
+        else:
+            return False
+
+    # A specialization only inherits from itself
+    def __ancestors(self, class_name: str) -> frozenset | None:
+        if (class_def := self.interpreter.get_class(class_name)) is not None:
+            return class_def.ancestors
+        elif class_name.find('@') != -1 and self.interpreter.get_tclass(class_name.split('@')[0]) is not None:
+            return frozenset([class_name])
+        else:
+            return None
+
+    # Two objects can be compared if either one's class inherits from the other one's (see __executor_compare)
+    # The class a Field carries is only known for exact types, or for classes without subclasses
+    def __comparable(self, left: StaticType, right: StaticType) -> bool | None:
+        left_exact = left.exact or len(self.__subclasses.get(left.obj_name, [])) <= 1
+        right_exact = right.exact or len(self.__subclasses.get(right.obj_name, [])) <= 1
+
+        right_inherits_left = self.__is_subclass(right.obj_name, left.obj_name)
+        if (left_exact and right_inherits_left is True) or (right_exact and self.__is_subclass(left.obj_name, right.obj_name) is True):
+            return True
+        elif right_inherits_left is False:
+            return False
+        else:
+            return None
+
+    # Same messages as utils.check_compatible_types
+    def __mismatch_message(self, to_type: Type, to_obj_name: str | None, value: StaticType) -> str:
+        if to_type in OBJECT_TYPES and value.type in OBJECT_TYPES:
+            return f"Expected object of type '{to_obj_name}' but got '{value.obj_name}' instead"
+        else:
+            return f"Expected {to_type} but got {value.type} instead"
+
+    def __call(self, context: MethodContext, line_num: int, target_obj: any, method_name: str, method_args: List[any]) -> StaticType:
+        # Arguments are evaluated first
+        arg_types = [self.__value(context, None, arg) for arg in method_args]
+        if any(arg_type is NEVER for arg_type in arg_types):
+            return NEVER
+        elif any(arg_type is None for arg_type in arg_types):
+            # A statement without a value cannot be passed, which the runtime does not report as a type error
+            self.__unverified()
+            return UNKNOWN
+        elif any(arg_type is UNKNOWN for arg_type in arg_types):
+            return UNKNOWN
+
+        # Classes whose vtable may be searched
+        if target_obj == InterpreterBase.ME_DEF:
+            dispatch_classes = self.__subclasses.get(context.owner.name, [context.owner])
+        elif target_obj == InterpreterBase.SUPER_DEF:
+            if context.owner.superclass is None:
+                self.__report(ErrorType.TYPE_ERROR, f"Super class does not exist on class {context.owner.name}", line_num)
+                return NEVER
+            dispatch_classes = [context.owner.superclass]
+        else:
+            if isinstance(target_obj, list):
+                target_type = self.__value(context, None, target_obj)
+                if target_type is NEVER:
+                    return NEVER
+                elif target_type is not None and target_type is not UNKNOWN and target_type.type not in OBJECT_TYPES:
+                    self.__report(ErrorType.TYPE_ERROR, "Expression does not return a class", line_num)
+                    return NEVER
+            else:
+                target_type = self.__name_type(context, target_obj)
+
+            if target_type is None:
+                self.__unverified()
+                return UNKNOWN
+            elif target_type is UNKNOWN or target_type.type not in OBJECT_TYPES:
+                return UNKNOWN
+            elif (dispatch_classes := self.__subclasses.get(target_type.obj_name)) is None:
+                specialization, _ = self.__specialization(target_type.obj_name, None)
+                if specialization is None:
+                    return UNKNOWN
+                dispatch_classes = [specialization]
+
+        # Every overload the runtime types of the arguments may pick (up to the first one that always accepts them)
+        # (no overload at all fails with a name error)
+        result = None
+        for dispatch_class in dispatch_classes:
+            for (owner, method) in dispatch_class.vtable.get((method_name, len(arg_types)), tuple()):
+                accepted = [self.__assignable(param[0], param[2], arg_type) for (param, arg_type) in zip(method.parameters, arg_types)]
+                if False in accepted:
+                    continue
+
+                method_result = self.__check_method(owner, method)
+                result = method_result if result is None else join(result, method_result)
+                if None not in accepted:
+                    break
+
+        return result if result is not None else UNKNOWN
+
+    # Creates (or looks up) a specialization by its full name, e.g. "node@int"
+    def __specialization(self, class_name: str, line_num: int | None) -> Tuple[any, TypeDiagnostic | None]:
+        if class_name in self.__specializations:
+            return self.__specializations[class_name]
+
+        tclass = self.interpreter.get_tclass(class_name.split('@')[0])
+        specialization = None
+        error = None
+        if tclass is None or class_name.find('@') == -1:
+            pass
+        elif len(self.__specializations) >= TypeChecker.MAX_SPECIALIZATIONS:
+            self.__unverified()
+            return (None, None)
+        else:
+            errors_before = len(self.__errors)
+            specialization = self.__guarded(lambda: tclass.get_specialization(class_name.split('@')[1:], self.interpreter))
+            if len(self.__errors) > errors_before:
+                # Only an actual "new" fails, so hold on to the error until one is found
+                error = self.__errors.pop()
+                error.line_num = error.line_num if error.line_num is not None else line_num
+
+        self.__specializations[class_name] = (specialization, error)
+        if specialization is not None:
+            self.__worklist.append(specialization)
+        return (specialization, error)
+
+    # Runs something that reports errors through interpreter.error, turning an error into a diagnostic
+    # The interpreter's error state is restored, since nothing has actually failed yet
+    def __guarded(self, run: Callable[[], any]) -> any:
+        error_type, error_line = self.interpreter.error_type, self.interpreter.error_line
+        try:
+            return run()
+        except RecursionError:
+            raise
+        except RuntimeError as e:
+            # The interpreter's message is "<error type>[ on line <line>]: <description>"
+            message = str(e).split(": ", 1)[1] if ": " in str(e) else ""
+            self.__report(self.interpreter.error_type, message, self.interpreter.error_line)
+            return None
+        finally:
+            self.interpreter.error_type, self.interpreter.error_line = error_type, error_line
+
+# Runs a program with type checking, then lists the type errors found before it ran
+# Usage: python3 typechecker.py program.brewin
+if __name__ == "__main__":
+    import sys
+    from interpreterv3 import Interpreter
+
+    with open(sys.argv[1]) as f:
+        program = f.read().splitlines()
+
+    interpreter = Interpreter(type_check=True)
+    try:
+        interpreter.run(program)
+    finally:
+        print()
+        for type_error in interpreter.type_errors:
+            print(f"{type_error.error_type} on line {type_error.line_num}: {type_error.message}")
+        print("verified" if interpreter.verified else f"not verified ({len(interpreter.type_errors)} type errors)")
@@ -1,7 +1,7 @@
-from helperclasses import Field, Method, Type
-from intbase import InterpreterBase
+from helperclasses import CallFrame, Field, LocalRef, Method, Type, ValueField, value_field
+from intbase import ErrorType, InterpreterBase
 
-from typing import List, Tuple
+from typing import Iterable, List, Tuple
 
 def parse_type_value(val: str) -> Tuple[Type | None, int | bool | None | str]:
     final_val = (None, None)
@@ -125,24 +125,166 @@ def check_compatible_types(field1: Field, field2: Field, interpreter: Interprete
             return True
         # Allow polymorphism
         elif field2.value is None:
-            # We are getting a none value, so need to create a dummy object to ask if it inherits
-            dummy_class = interpreter.get_class(field2.obj_name)
-            if dummy_class is not None:
-                dummy_obj = dummy_class.instantiate_self()
-                if dummy_obj.inherits(field1.obj_name):
+            # We are getting a none value, so ask the class hierarchy directly
+            null_class = interpreter.get_class(field2.obj_name)
+            if null_class is not None:
+                if field1.obj_name in null_class.ancestors:
                     return True
                 else:
-                    raise Exception(f"Expected object of type '{field1.obj_name}' but got '{field2.obj_name}' instead")
+                    raise RuntimeError(f"Expected object of type '{field1.obj_name}' but got '{field2.obj_name}' instead")
             else:
-                raise Exception(f"Type '{field2.obj_name}' does not exist")
+                raise RuntimeError(f"Type '{field2.obj_name}' does not exist")
         elif field2.value.inherits(field1.obj_name):   
             return True
         else:
-            raise Exception(f"Expected object of type '{field1.obj_name}' but got '{field2.obj_name}' instead")
+            raise RuntimeError(f"Expected object of type '{field1.obj_name}' but got '{field2.obj_name}' instead")
     elif field1.type == field2.type:    # For everything else, compare type
         return True
     else:
-        raise Exception(f"Expected {field1.type} but got {field2.type} instead")
+        raise RuntimeError(f"Expected {field1.type} but got {field2.type} instead")
+
+# Same rules as check_compatible_types, but answers with a bool instead of raising (no message is built)
+def is_compatible_type(to_type: Type, to_obj_name: str | None, from_type: Type, from_obj_name: str | None, from_value: any, interpreter: InterpreterBase) -> bool:
+    if to_type in [Type.OBJ, Type.TCLASS] and from_type in [Type.OBJ, Type.TCLASS, Type.NULL]:
+        if from_type == Type.NULL or to_obj_name == from_obj_name:
+            return True
+        elif from_value is None:
+            null_class = interpreter.get_class(from_obj_name)
+            return null_class is not None and to_obj_name in null_class.ancestors
+        else:
+            return from_value.inherits(to_obj_name)
+    else:
+        return to_type == from_type
+
+# Checks the variables declared by a let statement, in order, raising the first error found
+# Each declaration becomes (frame slot, name, type, initial value, object name)
+def check_let_declarations(declared_vars: List[List[any]], line_num: int, current_class: any, interpreter: InterpreterBase) -> List[Tuple[int, str, Type, any, str | None]]:
+    checked_declarations = []
+    for dec_var in declared_vars:
+        field_type = dec_var[0]
+        field_name = dec_var[1]
+        init_value = dec_var[2] if (len(dec_var) >= 3) else None
+
+        if not isinstance(field_name, LocalRef):
+            interpreter.error(ErrorType.NAME_ERROR, f"Duplicate field: {field_name}", line_num)
+
+        # Initial value not provided, use default value
+        if init_value is None:
+            parsed_type = parse_type_from_str(field_type, interpreter.get_valid_class_list(), interpreter.get_valid_template_class_list())
+            if parsed_type is None or parsed_type == Type.NULL:
+                interpreter.error(ErrorType.TYPE_ERROR, f"Undeclared class '{field_type}'", line_num)
+
+            # If TCLASS, check if number of parameterized types is correct
+            if parsed_type == Type.TCLASS:
+                necessary_ptypes = interpreter.get_tclass(field_type.split('@')[0]).get_number_of_parameterized_types()
+                actual_ptypes = len(field_type.split('@')) - 1
+
+                if necessary_ptypes != actual_ptypes:
+                    interpreter.error(ErrorType.TYPE_ERROR, f"Incorrect number of parameterized types: Expected {necessary_ptypes} but got {actual_ptypes}")
+
+            default_init_value = get_default_value(parsed_type)
+            checked_declarations.append((field_name.index, field_name, parsed_type, default_init_value, (field_type if parsed_type == Type.OBJ or parsed_type == Type.TCLASS else None)))
+        # Initial value provided
+        else:
+            parsed_type, parsed_value = parse_value_given_type(field_type, init_value, current_class.get_names_of_valid_classes(), current_class.get_names_of_valid_tclasses())
+
+            # parsed_type will be none if an error occurred during value parsing (only possible error is incompatible type)
+            if parsed_type is None:
+                interpreter.error(ErrorType.TYPE_ERROR, f"Incompatible type '{field_type}' with value '{init_value}'", line_num)
+            elif parsed_type == Type.NULL:
+                interpreter.error(ErrorType.TYPE_ERROR, f"Undeclared class '{field_type if parsed_value is None else parsed_value}'", line_num)
+            elif parsed_type == Type.OBJ:
+                checked_declarations.append((field_name.index, field_name, parsed_type, None, parsed_value))
+            elif parsed_type == Type.TCLASS:
+                # Check if number of parameterized types is correct
+                necessary_ptypes = interpreter.get_tclass(parsed_value.split('@')[0]).get_number_of_parameterized_types()
+                actual_ptypes = len(field_type.split('@')) - 1
+
+                if necessary_ptypes != actual_ptypes:
+                    interpreter.error(ErrorType.TYPE_ERROR, f"Incorrect number of parameterized types: Expected {necessary_ptypes} but got {actual_ptypes}")
+
+                checked_declarations.append((field_name.index, field_name, parsed_type, None, parsed_value))
+            else:
+                checked_declarations.append((field_name.index, field_name, parsed_type, parsed_value, None))
+
+    return checked_declarations
+
+# Brewin prints "true/false" and "null" where Python would print "True/False" and "None"
+def stringify(thing: Field) -> str:
+    if thing.type == Type.BOOL:
+        return InterpreterBase.TRUE_DEF if thing.value else InterpreterBase.FALSE_DEF
+    elif thing.type == Type.NULL:
+        return InterpreterBase.NULL_DEF
+    else:
+        return str(thing.value)
+
+# A statement that is not an expression (a set, print, while...) has no value (None), which no operator accepts
+# Raises the error the tree-walking executors give for such an operand: operands holds the values of the operator's
+# operands, and written_operand is the operand of "!" as written
+def check_operands_have_values(command: str, operands: List[Field | None], written_operand: any, line_num: int | None, interpreter: InterpreterBase):
+    if all(operand is not None for operand in operands):
+        return
+
+    operand_types = [None if operand is None else operand.type for operand in operands]
+    if command == "!":
+        interpreter.error(ErrorType.TYPE_ERROR, f"The operator '!' is not compatible with the type of variable '{written_operand}': {operand_types[0]}", line_num)
+    else:
+        interpreter.error(ErrorType.TYPE_ERROR, f"Operands of type '{operand_types[0]}' and '{operand_types[1]}' are incompatible with operator: {command}", line_num)
+
+def new_object(class_name: str, line_num: int | None, interpreter: any) -> Field:
+    # Look for requested class
+    other_class = interpreter.get_class(class_name)
+    other_class_obj = None
+    if other_class is None:
+        # Check for template class
+        if (first_at_sign := class_name.find('@')) != -1:
+            other_class = interpreter.get_tclass(class_name[:first_at_sign])
+            if other_class is None:
+                interpreter.error(ErrorType.TYPE_ERROR, f"Unknown class: {class_name}", line_num)
+            else:
+                templated_types = class_name[first_at_sign + 1:].split('@')
+                other_class_obj = other_class.instantiate_self_tclass(templated_types, interpreter)
+        else:
+            interpreter.error(ErrorType.TYPE_ERROR, f"Unknown class: {class_name}", line_num)
+    else:
+        other_class_obj = other_class.instantiate_self()
+
+    return Field("temp", Type.OBJ, other_class_obj, class_name)
+
+def read_input(input_info: Tuple[str, any], frame: CallFrame, line_num: int | None, interpreter: InterpreterBase) -> Field:
+    command, var = input_info
+    read_into_object_field = not isinstance(var, LocalRef)
+    if read_into_object_field:
+        declared_field = frame.current_class.field_layout[var.slot]
+        read_into_field = Field(declared_field.name, declared_field.type, frame.receiver.values[var.slot], declared_field.obj_name)
+    else:
+        read_into_field = frame.locals[var.index]
+        if read_into_field.type not in [Type.INT, Type.STRING]:
+            interpreter.error(ErrorType.FAULT_ERROR, f"Cannot read into variable '{var}' of type {read_into_field.type}", line_num)
+
+    user_input = interpreter.get_input()
+
+    if read_into_field.type == Type.INT:
+        if command == InterpreterBase.INPUT_STRING_DEF:
+            interpreter.error(ErrorType.TYPE_ERROR, f"Incompatible type: Cannot read Type.STRING into Type.INT", line_num)
+
+        try:
+            int_val = int(user_input)
+        except Exception as e:
+            interpreter.error(ErrorType.TYPE_ERROR, f"Could not convert input to Type.INT", line_num)
+
+        read_into_field.value = int_val
+    else:
+        if command == InterpreterBase.INPUT_INT_DEF:
+            interpreter.error(ErrorType.TYPE_ERROR, f"Incompatible type: Cannot read Type.INT into Type.STRING", line_num)
+
+        read_into_field.value = user_input
+
+    # Object fields are stored by value, so write the result back
+    if read_into_object_field:
+        frame.receiver.values[var.slot] = read_into_field.value
+
+    return Field("temp", read_into_field.type, read_into_field.value)
 
 def get_default_value(return_type: Type) -> int | bool | str | None:
     match return_type:
@@ -161,24 +303,35 @@ def get_default_value(return_type: Type) -> int | bool | str | None:
         case _:
             raise Exception(f"Not a valid type '{return_type}'!")
 
+# A default value as a shared field (see ValueField)
+# Null references are shared per class name, for as long as the interpreter running the program (see null_object_fields)
+def get_default_field(return_type: Type, obj_name: str | None, interpreter: InterpreterBase) -> Field:
+    if obj_name is None:
+        return value_field(return_type, get_default_value(return_type))
+    elif (null_field := interpreter.null_object_fields.get((return_type, obj_name))) is None:
+        null_field = interpreter.null_object_fields[(return_type, obj_name)] = ValueField(return_type, get_default_value(return_type), obj_name)
+    return null_field
+
 def get_method_type_list(method_params: List[Tuple[Type, str, str]]) -> List[Tuple[Type, str]]:
     return map(
         lambda tuple: (tuple[0], tuple[2]),
         method_params
     )
 
-def get_correct_method(methods_list: List[Method], method_name: str, params: List[Tuple[Type, str, any]], interpreter: InterpreterBase) -> Method | None:
+# The parameter types of a method, used to tell overloads apart
+def get_method_signature(method_params: List[Tuple[Type, str, str]]) -> Tuple[Tuple[Type, str], ...]:
+    return tuple(get_method_type_list(method_params))
+
+def get_correct_method(candidates: Iterable[Method], params: List[Tuple[Type, str, any]], interpreter: InterpreterBase) -> Method | None:
     # Check for the correct method signature
-    for m in methods_list[method_name]:
+    for m in candidates:
         if len(m.parameters) != len(params):
             continue
-        
+
         for (mp_type, pp_type) in zip(get_method_type_list(m.parameters), params):
-            try:
-                check_compatible_types(Field("temp", mp_type[0], None, mp_type[1]), Field("temp", pp_type[0], pp_type[2], pp_type[1]), interpreter)
-            except Exception as e:
+            if not is_compatible_type(mp_type[0], mp_type[1], pp_type[0], pp_type[1], pp_type[2], interpreter):
                 break
         else:
             return m
     else:
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,351 @@
+from intbase import ErrorType, InterpreterBase
+from helperclasses import BrewinThrow, CallFrame, Field, Method, Type, bool_field, int_field, value_field
+from bytecode import CodeObject, NO_LINE, Opcode
+from objdef import ObjectDefinition
+import utils as utils
+
+from typing import List, Tuple
+
+# Opcodes as plain ints, so the dispatch loop only compares ints
+LOAD_CONST = int(Opcode.LOAD_CONST)
+LOAD_LOCAL = int(Opcode.LOAD_LOCAL)
+LOAD_FIELD = int(Opcode.LOAD_FIELD)
+LOAD_ME = int(Opcode.LOAD_ME)
+LOAD_NONE = int(Opcode.LOAD_NONE)
+POP = int(Opcode.POP)
+STORE_LOCAL = int(Opcode.STORE_LOCAL)
+STORE_FIELD = int(Opcode.STORE_FIELD)
+ADD = int(Opcode.ADD)
+SUB = int(Opcode.SUB)
+MUL = int(Opcode.MUL)
+DIV = int(Opcode.DIV)
+MOD = int(Opcode.MOD)
+LT = int(Opcode.LT)
+GT = int(Opcode.GT)
+LE = int(Opcode.LE)
+GE = int(Opcode.GE)
+EQ = int(Opcode.EQ)
+NE = int(Opcode.NE)
+AND = int(Opcode.AND)
+OR = int(Opcode.OR)
+NOT = int(Opcode.NOT)
+JUMP = int(Opcode.JUMP)
+JUMP_IF_FALSE = int(Opcode.JUMP_IF_FALSE)
+CALL = int(Opcode.CALL)
+CALL_EXPR = int(Opcode.CALL_EXPR)
+CALL_ME = int(Opcode.CALL_ME)
+CALL_SUPER = int(Opcode.CALL_SUPER)
+NEW = int(Opcode.NEW)
+PRINT = int(Opcode.PRINT)
+INPUT = int(Opcode.INPUT)
+LET = int(Opcode.LET)
+SETUP_TRY = int(Opcode.SETUP_TRY)
+POP_TRY = int(Opcode.POP_TRY)
+STORE_EXCEPTION = int(Opcode.STORE_EXCEPTION)
+THROW = int(Opcode.THROW)
+CHECK_RETURN = int(Opcode.CHECK_RETURN)
+RETURN = int(Opcode.RETURN)
+RETURN_NONE = int(Opcode.RETURN_NONE)
+END = int(Opcode.END)
+ERROR = int(Opcode.ERROR)
+RAISE = int(Opcode.RAISE)
+CHECK_OPERANDS = int(Opcode.CHECK_OPERANDS)
+
+INT = Type.INT
+STRING = Type.STRING
+BOOL = Type.BOOL
+EXCEPTION = Type.EXCEPTION
+
+# Runs a compiled method in the given frame
+# Returns (return_initiated, return_field) like the tree-walking executors; an uncaught exception is raised again as a BrewinThrow
+# Methods called from it run in the same dispatch loop: a call saves the caller's state as an activation record on a list
+# and switches to the callee, and returning switches back, so Brewin recursion never grows the Python stack
+# A call that is returned right away (outside any try statement) and returns the same type replaces the running method
+# instead, so tail recursion does not grow the activation records either
+def execute(code_object: CodeObject, interpreter: InterpreterBase, frame: CallFrame) -> Tuple[bool, Field | None]:
+    code_object.calls += 1
+    code = code_object.code
+    consts = code_object.consts
+    frame_locals = frame.locals
+    receiver = frame.receiver
+
+    stack: List[Field | None] = []
+    push = stack.append
+    pop = stack.pop
+    # (handler instruction, stack depth) of every try statement currently running, innermost last
+    try_blocks: List[Tuple[int, int]] = []
+
+    # Callers of the running method (up to the one this execute started with), innermost last,
+    # as (code object, pc, stack, try blocks, frame, method that was running, its pending check)
+    activations: List[Tuple[CodeObject, int, List[Field | None], List[Tuple[int, int]], CallFrame, Method | None, Tuple[CodeObject, int] | None]] = []
+    method = None
+    # The CHECK_RETURN (code object, pc after it) of the innermost tail call that the running method replaced, which
+    # still has to check what the method returns
+    pending_check = None
+    call_depth = len(interpreter.call_stack)
+
+    pc = 0
+    while True:
+        try:
+            while True:
+                opcode = code[pc]
+                arg = code[pc + 1]
+                pc += 2
+
+                if opcode == LOAD_LOCAL:
+                    push(frame_locals[arg])
+                elif opcode == LOAD_CONST:
+                    push(consts[arg])
+                elif opcode == LOAD_FIELD:
+                    field_slot, field_name, field_type, field_obj_name = consts[arg]
+                    push(Field(field_name, field_type, receiver.values[field_slot], field_obj_name))
+                elif opcode == JUMP_IF_FALSE:
+                    predicate = pop()
+                    if predicate is None:
+                        interpreter.error(ErrorType.TYPE_ERROR, f"Predicate cannot return null", __line(code_object, pc))
+                    elif predicate.type is not BOOL:
+                        interpreter.error(ErrorType.TYPE_ERROR, f"Predicate is not a boolean", __line(code_object, pc))
+                    elif not predicate.value:
+                        pc = 2 * arg
+                elif opcode == JUMP:
+                    pc = 2 * arg
+                elif opcode == LET:
+                    let_declarations = consts[arg]
+                    if let_declarations.checked is None:
+                        let_declarations.checked = utils.check_let_declarations(let_declarations.declared_vars, let_declarations.line_num, code_object.current_class, interpreter)
+                    for (local_index, var_name, var_type, init_value, obj_name) in let_declarations.checked:
+                        frame_locals[local_index] = Field(var_name, var_type, init_value, obj_name)
+                elif opcode == STORE_LOCAL:
+                    new_value = pop()
+                    if new_value is None:
+                        interpreter.error(ErrorType.TYPE_ERROR, f"Cannot set variable to result of void function", __line(code_object, pc))
+                    local_index, var_name = consts[arg]
+                    # A variable keeps its declared type, even when set to null
+                    field_to_be_set = frame_locals[local_index]
+                    __check_type(code_object, pc, field_to_be_set.type, field_to_be_set.obj_name, new_value, f"Invalid type for variable '{var_name}'", interpreter)
+                    field_to_be_set.value = new_value.value
+                elif opcode == STORE_FIELD:
+                    new_value = pop()
+                    if new_value is None:
+                        interpreter.error(ErrorType.TYPE_ERROR, f"Cannot set variable to result of void function", __line(code_object, pc))
+                    field_slot, var_name, field_type, field_obj_name = consts[arg]
+                    __check_type(code_object, pc, field_type, field_obj_name, new_value, f"Invalid type for variable '{var_name}'", interpreter)
+                    receiver.values[field_slot] = new_value.value
+                elif opcode <= MOD and opcode >= ADD:
+                    right = pop()
+                    left = stack[-1]
+                    if left.type is INT and right.type is INT:
+                        if opcode == ADD:
+                            stack[-1] = int_field(left.value + right.value)
+                        elif opcode == SUB:
+                            stack[-1] = int_field(left.value - right.value)
+                        elif opcode == MUL:
+                            stack[-1] = int_field(left.value * right.value)
+                        elif opcode == DIV:
+                            stack[-1] = int_field(left.value // right.value)     # Int division
+                        else:
+                            stack[-1] = int_field(left.value % right.value)
+                    elif opcode == ADD and left.type is STRING and right.type is STRING:
+                        stack[-1] = value_field(STRING, left.value + right.value)
+                    else:
+                        __binary_type_error(code_object, pc, opcode, left, right, interpreter)
+                elif opcode <= OR and opcode >= LT:
+                    right = pop()
+                    left = stack[-1]
+                    if left.type is right.type and (
+                        (opcode <= GE and left.type in (INT, STRING)) or
+                        (opcode <= NE and opcode >= EQ and left.type in (INT, STRING, BOOL)) or
+                        (opcode >= AND and left.type is BOOL)
+                    ):
+                        pass
+                    elif (opcode == EQ or opcode == NE) and \
+                        left.type in (Type.NULL, Type.OBJ, Type.TCLASS) and right.type in (Type.NULL, Type.OBJ, Type.TCLASS):
+                        # If either object reference is a literal "null", allowed, so need not check for same type
+                        # Else comparisons need to check for compatibility (only error if both ways are incompatible)
+                        if left.type is not Type.NULL and right.type is not Type.NULL:
+                            try:
+                                utils.check_compatible_types(left, right, interpreter)
+                            except RuntimeError:
+                                try:
+                                    utils.check_compatible_types(right, left, interpreter)
+                                except RuntimeError as e:
+                                    interpreter.error(ErrorType.TYPE_ERROR, f"Invalid type for operand '{right.name}': {str(e)}", __line(code_object, pc))
+                    else:
+                        __binary_type_error(code_object, pc, opcode, left, right, interpreter)
+
+                    if opcode == LT:
+                        result = left.value < right.value
+                    elif opcode == GT:
+                        result = left.value > right.value
+                    elif opcode == LE:
+                        result = left.value <= right.value
+                    elif opcode == GE:
+                        result = left.value >= right.value
+                    elif opcode == EQ:
+                        result = left.value == right.value
+                    elif opcode == NE:
+                        result = left.value != right.value
+                    elif opcode == AND:
+                        result = left.value and right.value
+                    else:
+                        result = left.value or right.value
+                    stack[-1] = bool_field(result)
+                elif opcode <= CALL_SUPER and opcode >= CALL:
+                    if opcode == CALL:
+                        method_name, argc, target_name = consts[arg]
+                        callee = pop().value
+                        args = __pop_args(stack, argc)
+                        if callee is None:
+                            interpreter.error(ErrorType.FAULT_ERROR, f"Reference is null: {target_name}", __line(code_object, pc))
+                        method_to_call, callee_frame = callee.prepare_call(method_name, args, interpreter)
+                    elif opcode == CALL_ME:
+                        method_name, argc = consts[arg]
+                        method_to_call, callee_frame = receiver.prepare_call(method_name, __pop_args(stack, argc), interpreter)
+                    elif opcode == CALL_EXPR:
+                        method_name, argc, _ = consts[arg]
+                        target_field = pop()
+                        args = __pop_args(stack, argc)
+                        if not isinstance(target_field.value, ObjectDefinition):
+                            interpreter.error(ErrorType.TYPE_ERROR, f"Expression does not return a class", __line(code_object, pc))
+                        method_to_call, callee_frame = target_field.value.prepare_call(method_name, args, interpreter)
+                    else:
+                        method_name, argc = consts[arg]
+                        method_to_call, callee_frame = receiver.prepare_call(method_name, __pop_args(stack, argc), interpreter, code_object.current_class.superclass)
+
+                    # Switch to the callee, in place of the running method if this is a tail call
+                    if not try_blocks and code[pc] == CHECK_RETURN and code[pc + 2] == RETURN and method_to_call.return_type == consts[code[pc + 1]]:
+                        interpreter.call_stack[-1] = callee_frame
+                        pending_check = (code_object, pc + 2)
+                    else:
+                        interpreter.push_frame(callee_frame)
+                        activations.append((code_object, pc, stack, try_blocks, frame, method, pending_check))
+                        pending_check = None
+                    code_object = method_to_call.code
+                    code_object.calls += 1
+                    code = code_object.code
+                    consts = code_object.consts
+                    frame = callee_frame
+                    frame_locals = frame.locals
+                    receiver = frame.receiver
+                    stack = []
+                    push = stack.append
+                    pop = stack.pop
+                    try_blocks = []
+                    method = method_to_call
+                    pc = 0
+                elif opcode == CHECK_RETURN:
+                    checked_type = consts[arg]
+                    __check_type(code_object, pc, checked_type[0], checked_type[1], stack[-1], "Invalid return type", interpreter)
+                elif opcode <= END and opcode >= RETURN:
+                    if opcode == RETURN:
+                        return_initiated, return_field = True, pop()
+                    elif opcode == RETURN_NONE:
+                        return_initiated, return_field = True, None
+                    else:
+                        return_initiated, return_field = False, pop()
+
+                    if pending_check is not None:
+                        return_field = ObjectDefinition.complete_call(method, return_field, interpreter)
+                        __check_type(pending_check[0], pending_check[1], method.return_type[0], method.return_type[1], return_field, "Invalid return type", interpreter)
+                    if not activations:
+                        return (return_initiated, return_field)
+
+                    # Back to the caller, with what the call gives back
+                    interpreter.pop_frame()
+                    return_field = ObjectDefinition.complete_call(method, return_field, interpreter)
+                    code_object, pc, stack, try_blocks, frame, method, pending_check = activations.pop()
+                    code = code_object.code
+                    consts = code_object.consts
+                    frame_locals = frame.locals
+                    receiver = frame.receiver
+                    push = stack.append
+                    pop = stack.pop
+                    push(return_field)
+                elif opcode == POP:
+                    pop()
+                elif opcode == LOAD_ME:
+                    push(Field("temp", Type.OBJ, receiver, receiver.class_name))
+                elif opcode == LOAD_NONE:
+                    push(None)
+                elif opcode == NOT:
+                    operand = stack[-1]
+                    # Unary NOT only works on booleans
+                    if operand.type is not BOOL:
+                        interpreter.error(ErrorType.TYPE_ERROR, f"The operator '!' is not compatible with the type of variable '{consts[arg]}': {operand.type}", __line(code_object, pc))
+                    stack[-1] = bool_field(not operand.value)
+                elif opcode == NEW:
+                    push(utils.new_object(consts[arg], __line(code_object, pc), interpreter))
+                elif opcode == PRINT:
+                    interpreter.output("".join([utils.stringify(thing) for thing in __pop_args(stack, arg)]))
+                elif opcode == SETUP_TRY:
+                    try_blocks.append((arg, len(stack)))
+                elif opcode == POP_TRY:
+                    try_blocks.pop()
+                elif opcode == STORE_EXCEPTION:
+                    frame_locals[arg] = Field(InterpreterBase.EXCEPTION_VARIABLE_DEF, Type.STRING, pop().value, None)
+                elif opcode == THROW:
+                    exception_msg = pop()
+                    if exception_msg.type is not STRING:
+                        interpreter.error(ErrorType.TYPE_ERROR, f"Cannot throw object of type '{exception_msg.type}', expected 'Type.STRING'")
+                    raise BrewinThrow(Field("temp", EXCEPTION, exception_msg.value, None))
+                elif opcode == INPUT:
+                    push(utils.read_input(consts[arg], frame, __line(code_object, pc), interpreter))
+                elif opcode == ERROR:
+                    error_type, message, line_num = consts[arg]
+                    interpreter.error(error_type, message, line_num)
+                elif opcode == RAISE:
+                    raise consts[arg]
+                elif opcode == CHECK_OPERANDS:
+                    command, operand_count, written_operand = consts[arg]
+                    utils.check_operands_have_values(command, stack[-operand_count:], written_operand, __line(code_object, pc), interpreter)
+                else:
+                    raise Exception(f"Unknown opcode {opcode}")
+
+        # Jump to the innermost catch statement, unwinding the methods without one
+        # (or raise the exception to the caller of execute if none of them has one)
+        except BrewinThrow as thrown:
+            while not try_blocks and activations:
+                interpreter.pop_frame()
+                code_object, pc, stack, try_blocks, frame, method, pending_check = activations.pop()
+                code = code_object.code
+                consts = code_object.consts
+                frame_locals = frame.locals
+                receiver = frame.receiver
+                push = stack.append
+                pop = stack.pop
+
+            if not try_blocks:
+                raise
+
+            handler, stack_depth = try_blocks.pop()
+            del stack[stack_depth:]
+            push(thrown.exception_field)
+            pc = 2 * handler
+
+        # Errors end the program, but leave the call stack as the recursive call_method would have
+        except RuntimeError:
+            del interpreter.call_stack[call_depth:]
+            raise
+
+def __line(code_object: CodeObject, pc: int) -> int | None:
+    line_num = code_object.lines[pc // 2 - 1]
+    return line_num if line_num != NO_LINE else None
+
+def __pop_args(stack: List[Field], argc: int) -> List[Field]:
+    if argc == 0:
+        return []
+    args = stack[-argc:]
+    del stack[-argc:]
+    return args
+
+# Same rules (and messages) as utils.check_compatible_types, without building Fields on the common path
+def __check_type(code_object: CodeObject, pc: int, to_type: Type, to_obj_name: str | None, value_field: Field, message_prefix: str, interpreter: InterpreterBase):
+    if not utils.is_compatible_type(to_type, to_obj_name, value_field.type, value_field.obj_name, value_field.value, interpreter):
+        try:
+            utils.check_compatible_types(Field("temp", to_type, None, to_obj_name), value_field, interpreter)
+        except Exception as e:
+            interpreter.error(ErrorType.TYPE_ERROR, f"{message_prefix}: {str(e)}", __line(code_object, pc))
+
+def __binary_type_error(code_object: CodeObject, pc: int, opcode: int, left: Field, right: Field, interpreter: InterpreterBase):
+    command = {ADD: "+", SUB: "-", MUL: "*", DIV: "/", MOD: "%", LT: "<", GT: ">", LE: "<=", GE: ">=", EQ: "==", NE: "!=", AND: "&", OR: "|"}[opcode]
+    interpreter.error(ErrorType.TYPE_ERROR, f"Operands of type '{left.type}' and '{right.type}' are incompatible with operator: {command}", __line(code_object, pc))